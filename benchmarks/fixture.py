@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Offline weather fixture of the benchmarks.
+
+A clear-sky typical year at the default site (Madrid), hourly, in the same
+format get_tmy returns: ghi, dni, dhi, temp_air and wind_speed on a UTC index
+of one year. It is built from pvlib's simplified Solis model, which needs no
+data files, so every machine gets exactly the same frame without network.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+import pandas as pd
+from pvlib import location
+
+latitude = 40.45
+longitude = -3.73
+year = 2019
+
+
+def clear_sky_tmy(hours=8760, freq='h'):
+    """Clear-sky weather frame of `hours` hours from January 1st."""
+
+    periods = int(round(hours / (pd.Timedelta(pd.tseries.frequencies.to_offset(freq)) / pd.Timedelta('1h'))))
+    times = pd.date_range(f'{year}-01-01', periods=periods, freq=freq, tz='UTC')
+    site = location.Location(latitude, longitude, altitude=667)
+    data = site.get_clearsky(times, model='simplified_solis')[['ghi', 'dni', 'dhi']]
+
+    # Smooth daily and yearly temperature cycle, constant light wind
+    day = (times.dayofyear.to_numpy() - 1 + times.hour.to_numpy() / 24) / 365
+    hour = times.hour.to_numpy() + times.minute.to_numpy() / 60
+    data['temp_air'] = 15 - 9 * np.cos(2 * np.pi * (day - 0.05)) - 5 * np.cos(2 * np.pi * (hour - 3) / 24)
+    data['wind_speed'] = 2.0
+
+    return data.astype('float64')
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the Bifacial Tool simulation pipeline.
+
+Times every stage of the model on the offline clear-sky fixture: solar
+position, orientation and pvfactors / infinite sheds irradiance for each
+tracking mode, the bifacial and monofacial electrical runs, the aggregation,
+full uncached runs and the sizing checks. Each case reports its best wall time over
+the repeats, its throughput in simulated hours per second and its peak
+traced memory.
+
+    python benchmarks/run_benchmarks.py                      # compare to baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline      # record this machine
+    python benchmarks/run_benchmarks.py -k irradiance --hours 744
+
+The run fails (exit 1) when a case is slower than its baseline by more than
+--threshold (25 % by default), or uses that much more memory. Baselines only
+compare on the same machine: record one before changing the code.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.insert(0, here)
+
+from bifacial_tool import engine, irradiance, sizing  # noqa: E402
+from bifacial_tool.aggregates import build_aggregates  # noqa: E402
+from bifacial_tool.engine import SimulationConfig, track_options  # noqa: E402
+from fixture import clear_sky_tmy, latitude, longitude  # noqa: E402
+
+default_baseline = os.path.join(here, 'baseline.json')
+
+exit_ok = 0
+exit_regression = 1
+
+
+def measure(function, repeat):
+    """Best wall time over `repeat` calls and peak traced memory of one more."""
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    # Memory in a separate call, tracemalloc slows the timed ones down
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def cases(data):
+    """(name, function, repeat, simulated hours) of every benchmark case."""
+
+    hours = len(data)
+    base = SimulationConfig(latitude=latitude, longitude=longitude)
+    solar_position = engine.get_solar_position(base, data.index)
+
+    yield 'solar_position', lambda: engine.get_solar_position(base, data.index), 5, hours
+
+    for tracking in track_options:
+        config = SimulationConfig(latitude=latitude, longitude=longitude, tracking=tracking, gcr=0.4)
+        name = tracking.lower().replace(' ', '_')
+        orientation = engine.get_orientation(config, solar_position)
+        yield f'orientation[{name}]', lambda c=config: engine.get_orientation(c, solar_position), 5, hours
+
+        for model in irradiance.irradiance_models:
+            c = SimulationConfig(**dict(config.to_dict(), irradiance_model=model))
+            yield (f'irradiance[{name}-{model}]',
+                   lambda c=c, o=orientation: engine.get_irradiance(c, solar_position, o, data, cache=False),
+                   1 if model == 'pvfactors' else 3, hours)
+
+    config = SimulationConfig(latitude=latitude, longitude=longitude, tracking='Backtrack', gcr=0.4,
+                              irradiance_model='infinite_sheds')
+    orientation = engine.get_orientation(config, solar_position)
+    irrad = engine.get_irradiance(config, solar_position, orientation, data, cache=False)
+    results, results_dc = engine.run_electrical(config, irrad)
+    dc_power = engine.installed_power(config)
+
+    # Bifacial and monofacial cases, the two ModelChain runs of the GUI
+    yield 'electrical', lambda: engine.run_electrical(config, irrad), 3, hours
+    yield 'aggregates', lambda: build_aggregates(results, results_dc, irrad, data['ghi'], dc_power), 5, hours
+
+    # Whole model after the solar position, without the irradiance cache
+    def full_run(c):
+        orientation = engine.get_orientation(c, solar_position)
+        irrad = engine.get_irradiance(c, solar_position, orientation, data, cache=False)
+        results, results_dc = engine.run_electrical(c, irrad)
+        return engine.aggregate(c, results, results_dc, irrad, data)
+
+    for tracking in track_options:
+        c = SimulationConfig(**dict(config.to_dict(), tracking=tracking))
+        yield (f'full_run[{tracking.lower().replace(" ", "_")}-infinite_sheds]',
+               lambda c=c: full_run(c), 3, hours)
+
+    # Sizing checks do not depend on the weather, they have no throughput
+    sizing.module_voltages()
+    yield 'sizing[single]', lambda: (sizing.voltage_check(config.module, config.inverter, 8),
+                                     sizing.sizing_check(config.module, config.inverter, 8, 4)), 5, None
+    yield 'sizing[catalogue]', lambda: sizing.feasible_combinations(range(4, 31), range(1, 21)), 1, None
+
+
+def run(hours=8760, select=None):
+    """Benchmark results keyed by case name."""
+
+    data = clear_sky_tmy(hours)
+
+    report = {}
+    for name, function, repeat, simulated in cases(data):
+        if select and not any(word in name for word in select):
+            continue
+        seconds, memory = measure(function, repeat)
+        throughput = simulated / seconds if simulated and seconds else None
+        report[name] = {'seconds': seconds,
+                        'hours_per_second': throughput,
+                        'peak_memory_mb': memory}
+        print(f'{name:45s} {seconds:9.4f} s {throughput or 0:12.0f} h/s {memory:9.1f} MB',
+              file=sys.stderr)
+    return {'hours': len(data), 'cases': report}
+
+
+def regressions(report, baseline, threshold):
+    """Cases slower, or using more memory, than baseline by more than `threshold`."""
+
+    failed = []
+    if baseline.get('hours') != report['hours']:
+        raise ValueError(f"Baseline was recorded for {baseline.get('hours')} hours, "
+                         f"not {report['hours']}")
+    for name, values in report['cases'].items():
+        reference = baseline['cases'].get(name)
+        if reference is None:
+            continue
+        for key in ('seconds', 'peak_memory_mb'):
+            if values[key] > reference[key] * (1 + threshold):
+                failed.append(f'{name}: {key} {values[key]:.4g} > {reference[key]:.4g} '
+                              f'(+{100 * (values[key] / reference[key] - 1):.0f} %)')
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the bifacial model pipeline.')
+    parser.add_argument('-k', dest='select', action='append', help='only cases containing this text')
+    parser.add_argument('--hours', type=int, default=8760, help='length of the fixture')
+    parser.add_argument('--baseline', default=default_baseline)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative regression')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args.hours, args.select)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        # A partial run (-k) only replaces its own cases
+        if args.select and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            if baseline.get('hours') == report['hours']:
+                report['cases'] = dict(baseline['cases'], **report['cases'])
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return exit_ok
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, record one with --save-baseline', file=sys.stderr)
+        return exit_ok
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failed = regressions(report, baseline, args.threshold)
+    for line in failed:
+        print(f'Regression: {line}', file=sys.stderr)
+    return exit_regression if failed else exit_ok
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Bifacial Tool: bifacial photovoltaic plants with single-axis trackers, on pvlib.
+
+Importing the package loads nothing else: the names below are imported from
+their module on first use, so a command or worker process only pays for
+the modules it runs. pvlib is loaded by the stages that call it, the GUI
+(tkinter) and the plots (matplotlib) only by `bifacial-tool gui`.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import importlib
+
+__version__ = '0.1.0'
+
+# Public name: module it lives in
+_exports = {'SimulationConfig': 'engine',
+            'SimulationResult': 'engine',
+            'run_simulation': 'engine',
+            'run_streaming': 'engine',
+            'Pipeline': 'pipeline',
+            'Aggregates': 'aggregates',
+            'get_tmy': 'weather',
+            'load_weather': 'weather',
+            'save_result': 'result_store',
+            'run_plant': 'plant',
+            'run_monte_carlo': 'uncertainty'}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{_exports[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+python -m bifacial_tool, same as the bifacial-tool command.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import sys
+from .cli import main
+
+sys.exit(main())
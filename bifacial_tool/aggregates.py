@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Monthly and annual aggregates of a Bifacial Tool run.
+
+The hourly results are reduced once per run to a small monthly table plus
+annual totals. Plots, the results panel and the saved results all read from
+it, so redrawing a chart needs no resampling. Long series are reduced chunk by
+chunk with RunningAggregates.
+
+Monthly values clip negative powers to zero as the monthly plots always did;
+annual totals are plain sums, as calc_model always reported them.
+
+@author: Jesús
+"""
+
+# Libraries
+
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+# Hourly series reduced into the monthly table, name: (frame, column)
+monthly_sources = {'energy': ('results', 'bifacial'),
+                   'energy non bifacial': ('results', 'non bifacial'),
+                   'dc energy': ('results_dc', 'p_mp'),
+                   'front irradiance': ('irrad', 'total_abs_front'),
+                   'rear irradiance': ('irrad', 'total_abs_back'),
+                   'effective irradiance': ('results', 'effective irradiance')}
+
+total_units = ('MWh', 'h', '%', 'pu', 'kWp')
+
+
+@dataclass
+class Aggregates:
+    """Monthly table (index 'YYYY-MM'), totals and yearly table of one run.
+
+    Monthly energies are in kWh, irradiation in kWh/m2, yield in kWh/kWp,
+    bifacial gain in % and PR in pu. The yearly table has the same columns,
+    one row per calendar year; `annual` holds the totals over the whole run,
+    the annual values of a TMY.
+    """
+
+    monthly: pd.DataFrame
+    annual: dict
+    yearly: pd.DataFrame = None
+
+    def total_results(self):
+        """Annual totals as the one-row frame save_results writes."""
+        return pd.DataFrame({key: [self.annual[key]] for key in
+                             ('Energy', 'Yield', 'Bifacial gains', 'PR', 'installed power')})
+
+    def summary(self):
+        """Values of the GUI results panel and loss diagram."""
+        return {'energy': self.annual['Energy'],
+                'yield': self.annual['Yield'],
+                'bifacial gains': self.annual['Bifacial gains'],
+                'pr': self.annual['PR'],
+                'installed power': self.annual['installed power'],
+                'Solar resource': self.annual['Solar resource'],
+                'Incident irradiance': self.annual['Incident irradiance'],
+                'Array energy': self.annual['Array energy'],
+                'Inverter energy': self.annual['Energy']}
+
+
+def interval_hours(index):
+    """Length in hours of the time step of `index`, 1 when it cannot be told."""
+
+    if len(index) < 2:
+        return 1.0
+    return float(np.median(np.diff(index.asi8))) / 3.6e12
+
+
+def _derived(table, dc_power):
+    """Yield, bifacial gain and PR columns of a table of energy sums in kWh."""
+
+    table['yield'] = table['energy'] / (dc_power / 1000)
+    table['bifacial gain'] = 100 * (table['energy'] - table['energy non bifacial']) / table['energy']
+    pr = (table['energy'] / table['effective irradiance']) / (dc_power / 1000)
+    table['pr'] = pr / (1 + (table['rear irradiance'] / table['effective irradiance']))
+    return table
+
+
+class RunningAggregates:
+    """Monthly sums of a run fed chunk by chunk.
+
+    Only one row of sums per month is kept, so a series of any length can be
+    reduced with the memory of its largest chunk. Powers are integrated with
+    the time step, `interval_hours`, taken from the first chunk when not given.
+    """
+
+    def __init__(self, dc_power, interval_hours=None):
+        self.dc_power = dc_power
+        self.interval_hours = interval_hours
+        self._monthly = {}
+        self._sums = dict.fromkeys(monthly_sources, 0.0)
+        self._ghi = 0.0
+
+    def update(self, results, results_dc, irrad, ghi):
+        """Add the hourly (or sub-hourly) frames of one chunk."""
+
+        if self.interval_hours is None:
+            self.interval_hours = interval_hours(results.index)
+        step = self.interval_hours
+
+        frames = {'results': results, 'results_dc': results_dc, 'irrad': irrad}
+        codes = np.asarray(results.index.year) * 12 + np.asarray(results.index.month) - 1
+        months, groups = np.unique(codes, return_inverse=True)
+
+        sums = {}
+        for name, (frame, column) in monthly_sources.items():
+            values = np.nan_to_num(np.asarray(frames[frame][column], dtype='float64')) * step
+            sums[name] = np.bincount(groups, weights=np.clip(values, 0, None), minlength=len(months))
+            self._sums[name] += values.sum()
+        for i, month in enumerate(months):
+            row = self._monthly.setdefault(int(month), dict.fromkeys(monthly_sources, 0.0))
+            for name in monthly_sources:
+                row[name] += sums[name][i]
+        self._ghi += float(np.nansum(ghi)) * step
+
+    def result(self):
+        """Aggregates of everything added so far."""
+
+        if not self._monthly:
+            raise ValueError('No weather data was added')
+        dc_power = self.dc_power
+        months = sorted(self._monthly)
+        labels = [f'{month // 12}-{month % 12 + 1:02d}' for month in months]
+        monthly = pd.DataFrame([self._monthly[month] for month in months],
+                               index=pd.Index(labels), columns=list(monthly_sources)) / 1000
+        yearly = monthly.groupby(np.array([month // 12 for month in months])).sum()
+        monthly = _derived(monthly, dc_power)
+        yearly = _derived(yearly, dc_power)
+
+        # Totals over the whole run, unclipped
+        sums = self._sums
+        glob_inc = sums['effective irradiance']
+        glob_back = sums['rear irradiance']
+        pr = (sums['energy'] / glob_inc) / (dc_power / 1000)
+        annual = {'Energy': sums['energy'] / 1e6,
+                  'Yield': sums['energy'] / dc_power,
+                  'Bifacial gains': ((sums['energy'] - sums['energy non bifacial']) / sums['energy']) * 100,
+                  'PR': pr / (1 + (glob_back / glob_inc)),
+                  'installed power': round(float(dc_power/1000), 2),
+                  'Solar resource': self._ghi / 1000,
+                  'Incident irradiance': glob_inc / 1000,
+                  'Front irradiance': sums['front irradiance'] / 1000,
+                  'Rear irradiance': glob_back / 1000,
+                  'Array energy': sums['dc energy'] / 1e6}
+        annual = {key: float(value) for key, value in annual.items()}
+
+        return Aggregates(monthly, annual, yearly)
+
+
+def build_aggregates(results, results_dc, irrad, ghi, dc_power, interval_hours=None):
+    """Reduce the hourly frames of a run. `dc_power` is the installed power in W."""
+
+    running = RunningAggregates(dc_power, interval_hours)
+    running.update(results, results_dc, irrad, ghi)
+    return running.result()
+
+
+# Energy sums add up over blocks, irradiation per m2 is averaged
+extensive_sources = ('energy', 'energy non bifacial', 'dc energy')
+
+
+def combine_aggregates(parts):
+    """Aggregates of a plant from those of its blocks.
+
+    `parts` is a list of (Aggregates, count, dc_power): the results of one
+    block, how many such blocks the plant has and the block's installed
+    power in W. Energies are scaled by the count, irradiation is averaged
+    weighted by installed power, and yield, bifacial gain and PR are
+    recomputed for the whole plant.
+    """
+
+    dc_total = sum(count * dc_power for _, count, dc_power in parts)
+    weights = [(count, count * dc_power / dc_total) for _, count, dc_power in parts]
+
+    def combine(tables):
+        total = None
+        for table, (count, share) in zip(tables, weights):
+            scale = pd.Series({name: count if name in extensive_sources else share
+                               for name in monthly_sources})
+            part = table[list(monthly_sources)] * scale
+            total = part if total is None else total.add(part, fill_value=0)
+        return _derived(total, dc_total)
+
+    monthly = combine([aggregates.monthly for aggregates, _, _ in parts])
+    yearly = None
+    if all(aggregates.yearly is not None for aggregates, _, _ in parts):
+        yearly = combine([aggregates.yearly for aggregates, _, _ in parts])
+
+    def total(key):
+        return sum(count * aggregates.annual[key] for aggregates, count, _ in parts)
+
+    def average(key):
+        return sum(count * dc_power * aggregates.annual[key] for aggregates, count, dc_power in parts) / dc_total
+
+    energy = total('Energy')
+    energy_non_bifacial = sum(count * a.annual['Energy'] * (1 - a.annual['Bifacial gains'] / 100)
+                              for a, count, _ in parts)
+    glob_inc = average('Incident irradiance')
+    glob_back = average('Rear irradiance')
+    pr = (energy * 1e6 / (glob_inc * 1000)) / (dc_total / 1000)
+    annual = {'Energy': energy,
+              'Yield': energy * 1e6 / dc_total,
+              'Bifacial gains': (energy - energy_non_bifacial) / energy * 100,
+              'PR': pr / (1 + (glob_back / glob_inc)),
+              'installed power': round(float(dc_total/1000), 2),
+              'Solar resource': parts[0][0].annual['Solar resource'],
+              'Incident irradiance': glob_inc,
+              'Front irradiance': average('Front irradiance'),
+              'Rear irradiance': glob_back,
+              'Array energy': total('Array energy')}
+    annual = {key: float(value) for key, value in annual.items()}
+
+    return Aggregates(monthly, annual, yearly)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Command line batch mode of the Bifacial Tool.
+
+    bifacial-tool run scenarios.yaml -o results.csv
+    bifacial-tool stream weather.csv scenarios.yaml -o yearly.csv
+    bifacial-tool gui
+
+The scenario file is YAML, JSON or CSV. YAML and JSON hold a `scenarios` list
+(and optional `defaults` applied to every scenario), CSV holds one scenario per
+row. Each scenario takes the SimulationConfig fields (latitude, longitude,
+module, inverter, tracking, gcr, row_height, row_width, albedo, bifaciality...)
+and an optional `name` and `weather`, a local weather file (EPW, TMY3, PVGIS
+CSV, CSV or Parquet series) used instead of the PVGIS TMY; the site is then
+taken from the file unless latitude and longitude are given. Scenarios run concurrently and the totals that
+save_results writes, plus the inputs, go to one results file (CSV or JSON).
+
+`stream` runs the scenarios over a long weather file instead of the PVGIS TMY,
+e.g. 20 years of hourly or 15-minute data (CSV with a time index and ghi, dni
+and dhi columns). The file is read in chunks of --chunk-rows rows and only
+monthly sums are kept, so memory does not grow with its length; the output
+has one row per scenario and year, or one row with the error of a scenario
+that failed. Columns take the same names as in local weather files (GHI,
+G(h)...).
+
+Exit codes: 0 every scenario ran, 1 at least one scenario failed (the others
+are still written), 2 invalid arguments or scenario file.
+
+Only the standard library is imported up front, so the CLI starts fast; the
+model is loaded when a command runs, and `gui` opens the Tk interface.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+exit_ok = 0
+exit_failed_scenarios = 1
+exit_usage = 2
+
+total_fields = ['Energy', 'Yield', 'Bifacial gains', 'PR', 'installed power']
+
+
+class ScenarioError(ValueError):
+    """Raised for a scenario file that cannot be read."""
+
+
+def read_scenarios(path):
+    """List of scenario dicts from a YAML, JSON or CSV file."""
+
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        with open(path, newline='') as f:
+            if extension in ('.yaml', '.yml'):
+                import yaml
+                content = yaml.safe_load(f)
+            elif extension == '.json':
+                content = json.load(f)
+            elif extension == '.csv':
+                content = {'scenarios': [{key: value for key, value in row.items() if value != ''}
+                                         for row in csv.DictReader(f)]}
+            else:
+                raise ScenarioError(f'Unknown scenario file type {extension!r}')
+    except (OSError, ValueError) as error:
+        raise ScenarioError(f'Cannot read {path}: {error}') from error
+
+    if isinstance(content, list):
+        content = {'scenarios': content}
+    if not isinstance(content, dict) or not content.get('scenarios'):
+        raise ScenarioError(f'{path} has no scenarios')
+
+    defaults = content.get('defaults') or {}
+    scenarios = []
+    for i, scenario in enumerate(content['scenarios']):
+        scenario = dict(defaults, **scenario)
+        scenario['name'] = str(scenario.get('name', f'scenario_{i}'))
+        if any(scenario['name'] == other['name'] for other in scenarios):
+            raise ScenarioError(f'Duplicated scenario name {scenario["name"]!r}')
+        scenarios.append(scenario)
+    return scenarios
+
+
+def _parse_config(scenario):
+    from dataclasses import fields
+    from .engine import SimulationConfig
+
+    # CSV values come in as text, cast them to the config field types
+    types = {f.name: f.type for f in fields(SimulationConfig)}
+    values = {}
+    for key, value in scenario.items():
+        key = key.replace(' ', '_')
+        if key in ('name', 'weather'):
+            continue
+        if key not in types:
+            raise ScenarioError(f'Unknown field {key!r} in scenario {scenario["name"]!r}')
+        # The albedo also takes monthly values or 'weather', SimulationConfig parses it
+        if isinstance(value, str) and types[key] in (int, float) and key != 'albedo':
+            try:
+                value = types[key](value)
+            except ValueError:
+                raise ScenarioError(f'Invalid {key} {value!r} in scenario {scenario["name"]!r}')
+        values[key] = value
+    try:
+        return SimulationConfig(**values)
+    except ValueError as error:
+        raise ScenarioError(f'Invalid scenario {scenario["name"]!r}: {error}')
+
+
+def _run_scenario(name, config, weather=None, profile_dir=None, store_root=None):
+    from .weather import get_tmy, load_weather
+    from .engine import run_simulation
+
+    # Sites and files were loaded into the cache by the parent process
+    if weather is not None:
+        data = load_weather(weather)[0]
+    else:
+        data = get_tmy(config.latitude, config.longitude, offline=True)[0]
+    result = run_simulation(config, data)
+
+    if profile_dir is not None:
+        with open(os.path.join(profile_dir, f'{name}.json'), 'w') as f:
+            json.dump(result.profile, f, indent=2)
+    if store_root is not None:
+        from .result_store import save_result
+        save_result(result, store_root, name)
+
+    row = {'name': name, 'status': 'ok', 'error': ''}
+    for key in total_fields:
+        row[key] = float(result.total_results[key].iloc[0])
+    row['seconds'] = result.profile['total_seconds']
+    row.update(config.to_dict())
+    return row
+
+
+def run(scenarios, processes=None, progress=None, profile_dir=None, store_root=None):
+    """Run every scenario, returning one row per scenario in input order.
+
+    With `profile_dir`, the stage timing report of each scenario is saved
+    there as <name>.json. With `store_root`, the hourly results of each
+    scenario are added to the result store there.
+    """
+
+    from dataclasses import replace
+    from .weather import get_tmy, load_weather
+
+    rows = {}
+    configs = {}
+    weather = {}
+    from_file = set()
+    for scenario in scenarios:
+        configs[scenario['name']] = _parse_config(scenario)
+        if 'weather' in scenario:
+            weather[scenario['name']] = str(scenario['weather'])
+            if 'latitude' not in scenario:
+                from_file.add(scenario['name'])
+
+    # Load each site and file once, sequentially, so workers never parse a
+    # file or go to PVGIS
+    failed_sites = {}
+    for name, config in configs.items():
+        site = weather.get(name, (round(config.latitude, 2), round(config.longitude, 2)))
+        if site in failed_sites:
+            continue
+        try:
+            if name in weather:
+                meta = load_weather(weather[name])[1]
+                if name in from_file and 'latitude' in meta:
+                    configs[name] = replace(config, latitude=meta['latitude'],
+                                            longitude=meta['longitude'])
+            else:
+                get_tmy(config.latitude, config.longitude)
+        except Exception as error:
+            failed_sites[site] = error
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {}
+        for name, config in configs.items():
+            site = weather.get(name, (round(config.latitude, 2), round(config.longitude, 2)))
+            if site in failed_sites:
+                rows[name] = {'name': name, 'status': 'failed',
+                              'error': f'weather: {failed_sites[site]}', **config.to_dict()}
+                continue
+            futures[pool.submit(_run_scenario, name, config, weather.get(name),
+                                 profile_dir, store_root)] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                rows[name] = future.result()
+            except Exception as error:
+                rows[name] = {'name': name, 'status': 'failed', 'error': repr(error),
+                              **configs[name].to_dict()}
+            if progress is not None:
+                progress(rows[name])
+
+    return [rows[name] for name in configs]
+
+
+def stream(weather_path, scenarios, chunk_rows=8760, interval_hours=None):
+    """Yearly results of every scenario over a chunked weather CSV, as rows.
+
+    A scenario that fails gets one row with its error, as in run.
+    """
+
+    import pandas as pd
+    from .engine import run_streaming
+    from .weather import normalize_weather
+
+    configs = {scenario['name']: _parse_config(scenario) for scenario in scenarios}
+
+    rows = []
+    for name, config in configs.items():
+        try:
+            chunks = pd.read_csv(weather_path, index_col=0, parse_dates=True, chunksize=chunk_rows)
+            # Same column names and cleaning as load_weather, chunk by chunk
+            aggregates = run_streaming(config, (normalize_weather(chunk) for chunk in chunks),
+                                       interval_hours)
+        except Exception as error:
+            rows.append({'name': name, 'status': 'failed', 'error': repr(error)})
+            continue
+        for year, values in aggregates.yearly.iterrows():
+            row = {'name': name, 'year': int(year), 'status': 'ok', 'error': ''}
+            row.update({key: float(value) for key, value in values.items()})
+            rows.append(row)
+    return rows
+
+
+def write_results(rows, path):
+    columns = ['name', 'status', 'error'] + total_fields
+    for row in rows:
+        columns += [key for key in row if key not in columns]
+
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path, 'w') as f:
+            json.dump(rows, f, indent=2)
+    else:
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bifacial-tool', description='Bifacial Tool batch mode.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run every scenario of a YAML, JSON or CSV file')
+    run_parser.add_argument('scenarios')
+    run_parser.add_argument('-o', '--output', default='results.csv',
+                            help='consolidated results, .csv or .json')
+    run_parser.add_argument('-j', '--processes', type=int, default=None)
+    run_parser.add_argument('-q', '--quiet', action='store_true')
+    run_parser.add_argument('--profile-dir', help='save the stage timing of every scenario here as JSON')
+    run_parser.add_argument('--store', help='add the hourly results to the result store in this folder')
+    stream_parser = subparsers.add_parser('stream', help='run scenarios over a long weather CSV, chunk by chunk')
+    stream_parser.add_argument('weather', help='CSV with a time index and ghi, dni, dhi columns')
+    stream_parser.add_argument('scenarios')
+    stream_parser.add_argument('-o', '--output', default='yearly.csv')
+    stream_parser.add_argument('--chunk-rows', type=int, default=8760)
+    stream_parser.add_argument('--interval-hours', type=float,
+                               help='time step of the weather data, from its index by default')
+    subparsers.add_parser('gui', help='open the graphical interface')
+    args = parser.parse_args(argv)
+
+    if args.command == 'gui':
+        from .gui import main as gui_main
+        gui_main()
+        return exit_ok
+
+    if args.command == 'stream':
+        try:
+            rows = stream(args.weather, read_scenarios(args.scenarios),
+                          args.chunk_rows, args.interval_hours)
+        except ScenarioError as error:
+            print(f'bifacial-tool: {error}', file=sys.stderr)
+            return exit_usage
+        columns = ['name', 'year', 'status', 'error']
+        for row in rows:
+            columns += [key for key in row if key not in columns]
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        if any(row['status'] != 'ok' for row in rows):
+            return exit_failed_scenarios
+        return exit_ok
+
+    try:
+        scenarios = read_scenarios(args.scenarios)
+        if args.quiet:
+            progress = None
+        else:
+            def progress(row):
+                print(f"{row['name']}: {row['status']} {row['error']}".rstrip(), file=sys.stderr)
+        if args.profile_dir:
+            os.makedirs(args.profile_dir, exist_ok=True)
+        rows = run(scenarios, args.processes, progress, args.profile_dir, args.store)
+    except ScenarioError as error:
+        print(f'bifacial-tool: {error}', file=sys.stderr)
+        return exit_usage
+
+    write_results(rows, args.output)
+    if any(row['status'] != 'ok' for row in rows):
+        return exit_failed_scenarios
+    return exit_ok
+
+
+if __name__ == "__main__":
+    sys.exit(main())
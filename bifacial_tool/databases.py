@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+CEC module and inverter databases.
+
+The SAM CSV files shipped with pvlib are slow to parse, so they are read on
+first use only, filtered to bifacial modules once and kept in a pickle cache
+stamped with the cache format and pvlib versions. Parameters are looked up
+by name as a column of the database frame, without transposing it.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import os
+import pickle
+from importlib.metadata import version
+from . import store
+
+database_version = 1
+
+_databases = {}
+
+
+def pvlib_version():
+    # From the package metadata, a cache hit never imports pvlib
+    return version('pvlib')
+
+
+def _cache_path():
+    return os.path.join(store.cache_root('sam'),
+                        f'cec_v{database_version}_pvlib{pvlib_version()}.pkl')
+
+
+def _load():
+    if _databases:
+        return _databases
+
+    path = _cache_path()
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('version') == (database_version, pvlib_version()):
+            _databases.update(cached)
+            return _databases
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    from pvlib import pvsystem
+    cec_modules = pvsystem.retrieve_sam('CECMod')
+    cec_inverters = pvsystem.retrieve_sam('cecinverter')
+    bifacial_modules = cec_modules.loc[:, cec_modules.loc['Bifacial'] == 1]
+
+    _databases.update({'version': (database_version, pvlib_version()),
+                       'modules': bifacial_modules,
+                       'inverters': cec_inverters,
+                       'module_names': bifacial_modules.columns.to_list(),
+                       'inverter_names': cec_inverters.columns.to_list()})
+
+    tmp = f'{path}.tmp-{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        pickle.dump(_databases, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+    return _databases
+
+
+def get_modules():
+    """Bifacial CEC modules, one column per module."""
+    return _load()['modules']
+
+
+def get_inverters():
+    """CEC inverters, one column per inverter."""
+    return _load()['inverters']
+
+
+def module_names():
+    return _load()['module_names']
+
+
+def inverter_names():
+    return _load()['inverter_names']
+
+
+def get_module(name):
+    return get_modules()[name]
+
+
+def get_inverter(name):
+    return get_inverters()[name]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Batched electrical model of the Bifacial Tool.
+
+Evaluates the same chain as pvlib's ModelChain.run_model_from_effective_irradiance
+(SAPM cell temperature, CEC single diode, no DC losses, Sandia inverter) over a
+2-D block of effective irradiance, one row per case. The monofacial run and
+any number of bifaciality factors are solved in a single pass instead of one
+ModelChain run each.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+
+# ModelChain fills these in when the weather has no temperature or wind
+default_temp_air = 20
+default_wind_speed = 0
+
+
+def effective_irradiance_cases(front, back, bifacialities):
+    """Stack front + bifaciality * back for each factor, shape (cases, times)."""
+
+    front = np.asarray(front, dtype='float64')
+    back = np.asarray(back, dtype='float64')
+    bifacialities = np.asarray(bifacialities, dtype='float64').reshape(-1, 1)
+    return front + back * bifacialities
+
+
+def run_electrical(effective_irradiance, module, inverter, temp_model_parameters,
+                   modules_per_string, strings, temp_air=default_temp_air,
+                   wind_speed=default_wind_speed, dc_scale=1.0):
+    """DC and AC power of every row of a (cases, times) irradiance block.
+
+    Returns a dict of (cases, times) arrays: 'ac', 'p_mp', 'v_mp', 'i_mp',
+    'v_oc', 'i_sc' and 'temp_cell'. `dc_scale` multiplies the array current,
+    either as a scalar or as one factor per case.
+    """
+
+    from pvlib import pvsystem, temperature, inverter as pv_inverter
+
+    effective_irradiance = np.atleast_2d(np.asarray(effective_irradiance, dtype='float64'))
+    shape = effective_irradiance.shape
+
+    # The effective irradiance stands in for the plane of array irradiance
+    temp_cell = temperature.sapm_cell(effective_irradiance, temp_air, wind_speed,
+                                      temp_model_parameters['a'],
+                                      temp_model_parameters['b'],
+                                      temp_model_parameters['deltaT'])
+
+    # Single diode over the whole block at once
+    IL, I0, Rs, Rsh, nNsVth = pvsystem.calcparams_cec(effective_irradiance.ravel(),
+                                                      np.ravel(temp_cell),
+                                                      alpha_sc = module['alpha_sc'],
+                                                      a_ref = module['a_ref'],
+                                                      I_L_ref = module['I_L_ref'],
+                                                      I_o_ref = module['I_o_ref'],
+                                                      R_sh_ref = module['R_sh_ref'],
+                                                      R_s = module['R_s'],
+                                                      Adjust = module['Adjust'])
+    curve = pvsystem.singlediode(IL, I0, Rs, Rsh, nNsVth, method='lambertw')
+
+    dc_scale = np.asarray(dc_scale, dtype='float64')
+    if dc_scale.ndim == 1:
+        dc_scale = dc_scale.reshape(-1, 1)
+
+    out = {}
+    for key in ('i_sc', 'i_mp'):
+        out[key] = np.asarray(curve[key]).reshape(shape) * strings * dc_scale
+    for key in ('v_oc', 'v_mp'):
+        out[key] = np.asarray(curve[key]).reshape(shape) * modules_per_string
+    out['p_mp'] = out['i_mp'] * out['v_mp']
+    out['temp_cell'] = np.asarray(temp_cell)
+
+    out['ac'] = pv_inverter.sandia(out['v_mp'], out['p_mp'], inverter)
+
+    return out
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Headless simulation engine for the Bifacial Tool.
+
+Runs the same model as the GUI without any Tk dependency: a SimulationConfig
+goes in, a SimulationResult comes out. The GUI, scripts and workers all call
+run_simulation().
+
+@author: Jesús
+"""
+
+# Libraries
+
+import hashlib
+from dataclasses import dataclass, asdict, fields
+import numpy as np
+import pandas as pd
+from . import irradiance
+from . import electrical
+from . import tracking
+from .databases import get_module, get_inverter
+from .aggregates import Aggregates, RunningAggregates, build_aggregates
+from .profiling import Profiler, profiled
+
+track_options = ['Track', 'Backtrack', 'Fixed tilt']
+
+# Default equipment
+module = 'LONGi_Green_Energy_Technology_Co___Ltd__LR6_72BP_350M'
+inverter = 'ABB__PVI_10_0_I_OUTD_x_US_480_y_z__480V_'
+# pvlib's SAPM open_rack_glass_glass, kept here so importing the engine
+# does not load pvlib
+temp_model_parameters = {'a': -3.47, 'b': -0.0594, 'deltaT': 3}
+
+
+def parse_albedo(value):
+    """Albedo as a float, a tuple of 12 monthly values or 'weather'.
+
+    Text is accepted as from the GUI or a CSV: '0.25', 'weather' or twelve
+    values separated by commas or semicolons.
+    """
+
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lower() == 'weather':
+            return 'weather'
+        values = [float(v) for v in text.replace(';', ',').split(',') if v.strip()]
+        value = values[0] if len(values) == 1 else values
+    if isinstance(value, (list, tuple, np.ndarray)):
+        if len(value) != 12:
+            raise ValueError(f'A monthly albedo needs 12 values, got {len(value)}')
+        return tuple(float(v) for v in value)
+    return float(value)
+
+
+@dataclass
+class SimulationConfig:
+    """Every input of one simulation run, defaults as in the GUI."""
+
+    latitude: float = 40.45
+    longitude: float = -3.73
+    module: str = module
+    inverter: str = inverter
+    tracking: str = 'Fixed tilt'
+    modules_per_string: int = 8
+    strings: int = 4
+    gcr: float = 1.0
+    pannel_azimuth: float = 180.0
+    pannel_tilt: float = 30.0
+    # A float, 12 monthly values or 'weather' for the weather's albedo column
+    albedo: float = 0.2
+    row_height: float = 3.0
+    row_width: float = 4.0
+    bifaciality: float = 0.75
+    irradiance_model: str = 'pvfactors'
+    axis_tilt: float = 0.0
+    axis_azimuth: float = 180.0
+    max_angle: float = 60.0
+    # Row seen by the irradiance model: 'interior', the 'first' / 'last' edge
+    # row, or 'field', the mean row of a field of n_rows rows
+    row_position: str = 'interior'
+    n_rows: int = 3
+
+    def __post_init__(self):
+        self.albedo = parse_albedo(self.albedo)
+
+    @classmethod
+    def from_dict(cls, values):
+        """Build a config from a dict, accepting the GUI's 'row height' style keys."""
+        names = {f.name for f in fields(cls)}
+        kwargs = {}
+        for key, value in values.items():
+            key = key.replace(' ', '_')
+            if key in names:
+                kwargs[key] = value
+        return cls(**kwargs)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class SimulationResult:
+    """Hourly frames and monthly/annual aggregates of one run."""
+
+    config: SimulationConfig
+    results: pd.DataFrame
+    results_dc: pd.DataFrame
+    irrad: pd.DataFrame
+    aggregates: Aggregates
+    profile: dict = None
+    # Fingerprint of the weather frame the run used, see weather_key
+    weather: str = None
+
+    @property
+    def total_results(self):
+        return self.aggregates.total_results()
+
+    @property
+    def summary(self):
+        return self.aggregates.summary()
+
+
+def weather_key(data):
+    """Hash of a weather frame: its times, columns and values."""
+
+    h = hashlib.sha1()
+    h.update(data.index.asi8.tobytes())
+    h.update(np.ascontiguousarray(data.to_numpy(dtype='float64')).tobytes())
+    h.update(str(list(data.columns)).encode())
+    return h.hexdigest()
+
+
+def get_location(config):
+    from pvlib import location
+    return location.Location(latitude = config.latitude,
+                             longitude = config.longitude)
+
+
+def get_solar_position(config, times):
+    return get_location(config).get_solarposition(times)
+
+
+def get_mount(config):
+    from pvlib import pvsystem
+
+    if config.tracking == 'Backtrack':
+        return pvsystem.SingleAxisTrackerMount(axis_tilt=config.axis_tilt,
+                                               axis_azimuth=config.axis_azimuth,
+                                               max_angle=config.max_angle,
+                                               backtrack=True,
+                                               gcr=config.gcr)
+
+    elif config.tracking == 'Track':
+        return pvsystem.SingleAxisTrackerMount(axis_tilt=config.axis_tilt,
+                                               axis_azimuth=config.axis_azimuth,
+                                               max_angle=config.max_angle,
+                                               backtrack=False,
+                                               gcr=config.gcr)
+
+    elif config.tracking == 'Fixed tilt':
+        return pvsystem.FixedMount(surface_tilt = config.pannel_tilt,
+                                   surface_azimuth = config.pannel_azimuth)
+
+    raise ValueError(f'Unknown tracking mode {config.tracking!r}, expected one of {track_options}')
+
+
+def get_orientation(config, solar_position):
+
+    # Trackers share the ideal rotation of the site between runs
+    if config.tracking in ('Track', 'Backtrack'):
+        return tracking.tracker_orientation(solar_position, config.gcr,
+                                            axis_tilt = config.axis_tilt,
+                                            axis_azimuth = config.axis_azimuth,
+                                            max_angle = config.max_angle,
+                                            backtrack = config.tracking == 'Backtrack')
+
+    return get_mount(config).get_orientation(solar_position['apparent_zenith'],
+                                             solar_position['azimuth'])
+
+
+def get_albedo(config, data):
+    """Albedo of every timestamp of `data`, or a float when it is constant."""
+
+    if config.albedo == 'weather':
+        if 'albedo' not in data:
+            raise ValueError("Albedo 'weather' needs an albedo column in the weather data")
+        # Missing values (EPW writes 999) take the nearest valid one
+        albedo = data['albedo'].where((data['albedo'] > 0) & (data['albedo'] <= 1))
+        values = albedo.ffill().bfill().to_numpy(dtype='float64')
+        if np.isnan(values).all():
+            raise ValueError('The weather data has no valid albedo value')
+    elif isinstance(config.albedo, tuple):
+        values = np.asarray(config.albedo)[np.asarray(data.index.month) - 1]
+    else:
+        return config.albedo
+
+    if len(values) and (values == values[0]).all():
+        return float(values[0])
+    return values
+
+
+def get_irradiance(config, solar_position, orientation, data, cache=True):
+    return irradiance.get_irradiance(solar_position, orientation, data,
+                                     gcr = config.gcr,
+                                     row_height = config.row_height,
+                                     row_width = config.row_width,
+                                     albedo = get_albedo(config, data),
+                                     axis_azimuth = config.axis_azimuth,
+                                     model = config.irradiance_model,
+                                     cache = cache,
+                                     row_position = config.row_position,
+                                     n_rows = config.n_rows)
+
+
+def get_albedo_basis(config, solar_position, orientation, data, cache=True):
+    return irradiance.albedo_basis(solar_position, orientation, data,
+                                   gcr = config.gcr,
+                                   row_height = config.row_height,
+                                   row_width = config.row_width,
+                                   axis_azimuth = config.axis_azimuth,
+                                   model = config.irradiance_model,
+                                   cache = cache,
+                                   row_position = config.row_position,
+                                   n_rows = config.n_rows)
+
+
+def run_electrical(config, irrad):
+
+    my_module = get_module(config.module)
+    my_inverter = get_inverter(config.inverter)
+
+    # Monofacial and bifacial cases solved together, row 0 without rear gains
+    effective_irradiance = electrical.effective_irradiance_cases(irrad['total_abs_front'],
+                                                                 irrad['total_abs_back'],
+                                                                 [0, config.bifaciality])
+    out = electrical.run_electrical(effective_irradiance, my_module, my_inverter,
+                                    temp_model_parameters,
+                                    config.modules_per_string, config.strings)
+
+    results_dc = pd.DataFrame({key: out[key][1] for key in ('i_sc', 'v_oc', 'i_mp', 'v_mp', 'p_mp')},
+                              index = irrad.index)
+
+    # Create results dataframe
+    results = pd.DataFrame(index = irrad.index)
+    results['bifacial'] = out['ac'][1]
+    results['non bifacial'] = out['ac'][0]
+    results['effective irradiance'] = effective_irradiance[1]
+    results['rear irradiance'] = irrad['total_abs_back']
+
+    return results, results_dc
+
+
+def installed_power(config):
+    """DC power of the array at STC, in W."""
+    return get_module(config.module)['STC'] * config.strings * config.modules_per_string
+
+
+def aggregate(config, results, results_dc, irrad, data):
+    return build_aggregates(results, results_dc, irrad, data['ghi'], installed_power(config))
+
+
+def run_simulation(config, data, solar_position=None):
+    """Run the full model for one config over the weather frame `data`.
+
+    `solar_position` can be passed in when it was already computed for the
+    same site and time index, e.g. by a parameter sweep. The timing of every
+    stage is in the result's `profile`.
+    """
+
+    profiler = Profiler()
+    rows = len(data)
+    with profiled():
+        with profiler.stage('solar_position', rows) as record:
+            record['cached'] = solar_position is not None
+            if solar_position is None:
+                solar_position = get_solar_position(config, data.index)
+        with profiler.stage('orientation', rows):
+            orientation = get_orientation(config, solar_position)
+        with profiler.stage('irradiance', rows):
+            irrad = get_irradiance(config, solar_position, orientation, data)
+        with profiler.stage('electrical', rows):
+            results, results_dc = run_electrical(config, irrad)
+        irrad['effective_irradiance'] = results['effective irradiance']
+        with profiler.stage('aggregates', rows):
+            aggregates = aggregate(config, results, results_dc, irrad, data)
+
+    return SimulationResult(config, results, results_dc, irrad, aggregates, profiler.report(),
+                            weather_key(data))
+
+
+def split_weather(data, freq='YS'):
+    """Chunks of a weather frame, one per period of `freq` (pandas offset alias)."""
+
+    for _, chunk in data.groupby(pd.Grouper(freq=freq)):
+        if len(chunk):
+            yield chunk
+
+
+def run_streaming(config, chunks, interval_hours=None, progress=None):
+    """Run the model over an iterable of consecutive weather frames.
+
+    Each chunk goes through solar position, irradiance and electrical model
+    on its own and only its monthly sums are kept, so memory does not grow
+    with the length of the series: 20 years of 15-minute data are read one
+    chunk at a time, e.g. from split_weather or a chunked file reader.
+    progress(index, chunk) is called after every chunk. Returns the
+    Aggregates, with one row per year in `yearly`.
+    """
+
+    running = RunningAggregates(installed_power(config), interval_hours)
+    for i, data in enumerate(chunks):
+        solar_position = get_solar_position(config, data.index)
+        orientation = get_orientation(config, solar_position)
+        # Every chunk is seen once, keep it out of the irradiance cache
+        irrad = get_irradiance(config, solar_position, orientation, data, cache=False)
+        results, results_dc = run_electrical(config, irrad)
+        running.update(results, results_dc, irrad, data['ghi'])
+        if progress is not None:
+            progress(i, data)
+    return running.result()
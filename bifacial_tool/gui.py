@@ -0,0 +1,737 @@
+# -*- coding: utf-8 -*-
+"""
+
+https://re.jrc.ec.europa.eu/pvg_tools/en/#TMY
+
+@author: Jesús
+"""
+
+# Libraries
+
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from tkinter import filedialog, ttk
+import pandas as pd
+from .engine import SimulationConfig, track_options, module, inverter
+from .pipeline import Pipeline, Cancelled
+from .aggregates import total_units
+from .databases import get_module, get_inverter, module_names, inverter_names
+from .weather import get_tmy, load_weather, TMYNotCached
+from .irradiance import irradiance_models
+from .sizing import voltage_check, sizing_check
+from .profiling import Profiler, format_report
+from .result_store import save_result
+
+# Global variables
+type_options = ['Monthly Energy', 'Yield', 'Bifacial Gain', 'Performance Ratio']
+
+# Keeps the stages of the last run, so only the edited ones are recomputed
+pipeline = Pipeline()
+
+# Background jobs run one at a time on a worker thread, which owns the
+# pipeline; their progress comes back to the Tk thread through a queue
+executor = ThreadPoolExecutor(max_workers=1)
+jobs = []
+progress_queue = queue.Queue()
+
+def main():
+    
+    # Global variables and objects
+    global opts_dict, results_dict, location_dict, flag_inicio, root, progress_bar, jobs_list, status_label
+    global profile_label
+       
+    # Create main window
+    
+    root = tk.Tk()
+    root.title('Bifacial Tool')
+    
+    # Set full screen height and width
+    # screen_width = root.winfo_screenwidth()
+    # screen_height = root.winfo_screenheight()
+    # root.geometry(f"{screen_width}x{screen_height}")
+    
+    # Dictionaries for changing variables
+    opts_dict = {"type_plot": tk.StringVar(value = 'Monthly Energy'),
+                 "module": tk.StringVar(value = module),
+                 "inverter": tk.StringVar(value = inverter),
+                 "tracking": tk.StringVar(value = 'Fixed tilt'),
+                 'latitude': tk.DoubleVar(value = 40.45),
+                 'longitude': tk.DoubleVar(value = -3.73),
+                 'modules_per_string': tk.IntVar(value = 8),
+                 'strings': tk.IntVar(value = 4),
+                 'gcr': tk.DoubleVar(value = 1),
+                 'pannel_azimuth': tk.DoubleVar(value = 180.0),
+                 'pannel_tilt': tk.DoubleVar(value = 30.0),
+                 'albedo': tk.StringVar(value = '0.2'),
+                 'row height': tk.DoubleVar(value = 3),
+                 'row width': tk.DoubleVar(value = 4),
+                 'bifaciality': tk.DoubleVar(value = 0.75),
+                 'irradiance model': tk.StringVar(value = 'pvfactors'),
+                 'axis tilt': tk.DoubleVar(value = 0.0),
+                 'axis azimuth': tk.DoubleVar(value = 180.0),
+                 'max angle': tk.DoubleVar(value = 60.0)}
+    
+    results_dict = {'energy': tk.DoubleVar(value = 0.0),
+                    'yield': tk.DoubleVar(value = 0.0),
+                    'bifacial gains': tk.DoubleVar(value = 0.0),
+                    'pr': tk.DoubleVar(value = 0.0),
+                    'installed power': tk.DoubleVar(value = 0.0),
+                    'Solar resource': tk.DoubleVar(value = 0.0),
+                    'Incident irradiance': tk.DoubleVar(value = 0.0),
+                    'Array energy': tk.DoubleVar(value = 0.0),
+                    'Inverter energy': tk.DoubleVar(value = 0.0)}
+    
+    # TopLevel for the columns
+    options_window = tk.Frame(root)
+    plot_window = tk.Frame(root)
+    results_window = tk.Frame(root)
+    
+    # Options
+    # Latitude and longitude settings
+    lat_lon = tk.Frame(options_window, border = 50)
+    
+    lat_label = tk.Label(lat_lon, text="Set latitude: ")
+    lat_label.grid(row = 0, column = 0, sticky = 'w')
+    lat_entry = tk.Entry(lat_lon, textvariable=opts_dict['latitude'])
+    lat_entry.grid(row = 0, column = 1, sticky = 'w')
+    lat_entry.bind("<FocusOut>", lambda event: opts_dict['latitude'].set(float(lat_entry.get())))
+
+    lon_label = tk.Label(lat_lon, text="Set longitude: ")
+    lon_label.grid(row = 1, column = 0, sticky = 'w')
+    lon_entry = tk.Entry(lat_lon, textvariable=opts_dict['longitude'])
+    lon_entry.grid(row = 1, column = 1, sticky = 'w')
+    lon_entry.bind("<FocusOut>", lambda event: opts_dict['longitude'].set(float(lon_entry.get())))
+    solar_resource_button = tk.Button(lat_lon, text = 'Load Data', 
+                                      command = lambda: calc_solar_resource(location_criteria))
+    solar_resource_button.grid(row = 2, column = 0)
+    weather_file_button = tk.Button(lat_lon, text = 'Load File', 
+                                    command = lambda: load_weather_file(location_criteria))
+    weather_file_button.grid(row = 3, column = 0)
+    
+    # Location criteria
+    location_criteria = tk.Label(lat_lon)
+    location_criteria.config(text = 'Not loaded')
+    location_criteria.grid(row = 2, column = 1, sticky = 'w')
+    location_criteria.config(wraplength=200)
+    
+    lat_lon.pack()
+    
+    # Choose options
+    mod_inv = tk.Frame(options_window, border = 50)
+    
+    module_label = tk.Button(mod_inv, text="Module", command = lambda: open_params(get_module(module_selector.get())))
+    module_label.grid(row = 0, column = 0, sticky = 'w')
+    module_selector = ttk.Combobox(mod_inv, textvariable=opts_dict['module'], values=module_names())
+    module_selector.configure(width = 30)
+    module_selector.grid(row = 0, column = 1, sticky = 'w')
+    
+    inverter_label = tk.Button(mod_inv, text="Inverter", command = lambda: open_params(get_inverter(inverter_selector.get())))
+    inverter_label.grid(row = 2, column = 0, sticky = 'w')
+    inverter_selector = ttk.Combobox(mod_inv, textvariable=opts_dict['inverter'], values=inverter_names())
+    inverter_selector.configure(width = 30)
+    inverter_selector.grid(row = 2, column = 1, sticky = 'w')
+    
+    mod_inv.pack()
+    
+    track_opts = tk.Frame(options_window)
+    
+    track_label = tk.Label(track_opts, text="Tracking: ")
+    track_label.grid(row = 0, column = 0, sticky = 'w')
+    track_selector = tk.OptionMenu(track_opts, opts_dict["tracking"], *track_options)
+    track_selector.grid(row = 0, column = 1, sticky = 'w')
+    
+    irradiance_model_label = tk.Label(track_opts, text="Irradiance model: ")
+    irradiance_model_label.grid(row = 1, column = 0, sticky = 'w')
+    irradiance_model_selector = tk.OptionMenu(track_opts, opts_dict["irradiance model"], *irradiance_models)
+    irradiance_model_selector.grid(row = 1, column = 1, sticky = 'w')
+    
+    # Tracker axis
+    axis_tilt_label = tk.Label(track_opts, text="Axis tilt: ")
+    axis_tilt_label.grid(row = 2, column = 0, sticky = 'w')
+    axis_tilt_entry = tk.Entry(track_opts, textvariable=opts_dict['axis tilt'], width = 10)
+    axis_tilt_entry.grid(row = 2, column = 1, sticky = 'w')
+    axis_tilt_entry.bind("<FocusOut>", lambda event: opts_dict['axis tilt'].set(float(axis_tilt_entry.get())))
+    axis_tilt_units = tk.Label(track_opts, text="deg")
+    axis_tilt_units.grid(row = 2, column = 2, sticky = 'w')
+    
+    axis_azimuth_label = tk.Label(track_opts, text="Axis azimuth: ")
+    axis_azimuth_label.grid(row = 3, column = 0, sticky = 'w')
+    axis_azimuth_entry = tk.Entry(track_opts, textvariable=opts_dict['axis azimuth'], width = 10)
+    axis_azimuth_entry.grid(row = 3, column = 1, sticky = 'w')
+    axis_azimuth_entry.bind("<FocusOut>", lambda event: opts_dict['axis azimuth'].set(float(axis_azimuth_entry.get())))
+    axis_azimuth_units = tk.Label(track_opts, text="deg")
+    axis_azimuth_units.grid(row = 3, column = 2, sticky = 'w')
+    
+    max_angle_label = tk.Label(track_opts, text="Max rotation angle: ")
+    max_angle_label.grid(row = 4, column = 0, sticky = 'w')
+    max_angle_entry = tk.Entry(track_opts, textvariable=opts_dict['max angle'], width = 10)
+    max_angle_entry.grid(row = 4, column = 1, sticky = 'w')
+    max_angle_entry.bind("<FocusOut>", lambda event: opts_dict['max angle'].set(float(max_angle_entry.get())))
+    max_angle_units = tk.Label(track_opts, text="deg")
+    max_angle_units.grid(row = 4, column = 2, sticky = 'w')
+    
+    track_opts.pack()
+    
+    # Options window
+    
+    rows_strings = tk.Frame(options_window)
+    
+    #Pannel azimuth and tilt
+    azimuth_label = tk.Label(rows_strings, text="Pannel azimuth:")
+    azimuth_label.grid(row = 0, column = 0, sticky = 'w')
+    azimuth_entry = tk.Entry(rows_strings, textvariable=opts_dict['pannel_azimuth'], width = 10)
+    azimuth_entry.grid(row = 0, column = 1, sticky = 'w')
+    azimuth_entry.bind("<FocusOut>", lambda event: opts_dict['pannel_azimuth'].set(float(azimuth_entry.get())))
+    azimuth_units = tk.Label(rows_strings, text="deg")
+    azimuth_units.grid(row = 0, column = 2, sticky = 'w')
+    
+    tilt_label = tk.Label(rows_strings, text="Pannel tilt:")
+    tilt_label.grid(row = 1, column = 0, sticky = 'w')
+    tilt_entry = tk.Entry(rows_strings, textvariable=opts_dict['pannel_tilt'], width = 10)
+    tilt_entry.grid(row = 1, column = 1, sticky = 'w')
+    tilt_entry.bind("<FocusOut>", lambda event: opts_dict['pannel_tilt'].set(float(tilt_entry.get())))
+    tilt_units = tk.Label(rows_strings, text="deg")
+    tilt_units.grid(row = 1, column = 2, sticky = 'w')
+    
+    # modules per string and strings
+    mods_label = tk.Label(rows_strings, text="Modules per string: ")
+    mods_label.grid(row = 2, column = 0, sticky = 'w')
+    mods_entry = tk.Entry(rows_strings, textvariable=opts_dict['modules_per_string'], width = 10)
+    mods_entry.grid(row = 2, column = 1, sticky = 'w')
+    mods_entry.bind("<FocusOut>", lambda event: opts_dict['modules_per_string'].set(int(mods_entry.get())))
+    
+    strings_label = tk.Label(rows_strings, text="Strings: ")
+    strings_label.grid(row = 3, column = 0, sticky = 'w')
+    strings_entry = tk.Entry(rows_strings, textvariable=opts_dict['strings'], width = 10)
+    strings_entry.grid(row = 3, column = 1, sticky = 'w')
+    strings_entry.bind("<FocusOut>", lambda event: opts_dict['strings'].set(int(strings_entry.get())))
+    
+    # Set GCR
+    gcr_label = tk.Label(rows_strings, text="GCR: ")
+    gcr_label.grid(row = 4, column = 0, sticky = 'w')
+    gcr_entry = tk.Entry(rows_strings, textvariable=opts_dict['gcr'], width = 10)
+    gcr_entry.grid(row = 4, column = 1, sticky = 'w')
+    gcr_entry.bind("<FocusOut>", lambda event: opts_dict['gcr'].set(float(gcr_entry.get())))
+    
+    # Albedo
+    albedo_label = tk.Label(rows_strings, text="Albedo: ")
+    albedo_label.grid(row = 5, column = 0, sticky = 'w')
+    albedo_entry = tk.Entry(rows_strings, textvariable=opts_dict['albedo'], width = 10)
+    albedo_entry.grid(row = 5, column = 1, sticky = 'w')
+    albedo_entry.bind("<FocusOut>", lambda event: opts_dict['albedo'].set(albedo_entry.get()))
+    # A value, 12 monthly values or the weather file's albedo
+    albedo_units = tk.Label(rows_strings, text="or 12 monthly, or 'weather'")
+    albedo_units.grid(row = 5, column = 2, sticky = 'w')
+    
+    # Row height
+    r_height_label = tk.Label(rows_strings, text="PV row height: ")
+    r_height_label.grid(row = 6, column = 0, sticky = 'w')
+    r_height_entry = tk.Entry(rows_strings, textvariable=opts_dict['row height'], width = 10)
+    r_height_entry.grid(row = 6, column = 1, sticky = 'w')
+    r_height_entry.bind("<FocusOut>", lambda event: opts_dict['row height'].set(float(r_height_entry.get())))
+    r_height_units = tk.Label(rows_strings, text="m")
+    r_height_units.grid(row = 6, column = 2, sticky = 'w')
+    
+    # Row width
+    r_width_label = tk.Label(rows_strings, text="PV row width: ")
+    r_width_label.grid(row = 7, column = 0, sticky = 'w')
+    r_width_entry = tk.Entry(rows_strings, textvariable=opts_dict['row width'], width = 10)
+    r_width_entry.grid(row = 7, column = 1, sticky = 'w')
+    r_width_entry.bind("<FocusOut>", lambda event: opts_dict['row width'].set(float(r_width_entry.get())))
+    r_width_units = tk.Label(rows_strings, text="m")
+    r_width_units.grid(row = 7, column = 2, sticky = 'w')
+    
+    # Bifaciality
+    bifaciality_label = tk.Label(rows_strings, text="Module bifaciality: ")
+    bifaciality_label.grid(row = 8, column = 0, sticky = 'w')
+    bifaciality_entry = tk.Entry(rows_strings, textvariable=opts_dict['bifaciality'], width = 10)
+    bifaciality_entry.grid(row = 8, column = 1, sticky = 'w')
+    bifaciality_entry.bind("<FocusOut>", lambda event: opts_dict['bifaciality'].set(float(bifaciality_entry.get())))
+    
+    rows_strings.pack()
+    
+    # Calculate model
+    calc_frame = tk.Frame(options_window, border = 50)
+    
+    calc_label = tk.Label(calc_frame, text="Calculate model:")
+    calc_label.grid(row = 0, column = 0, sticky = 'w')
+    button_calc_model = tk.Button(calc_frame, text = 'Calculate', command = calc_model)
+    button_calc_model.grid(row = 0, column = 1, sticky = 'w')
+    
+    # Jobs queue, progress and cancellation
+    progress_bar = ttk.Progressbar(calc_frame, length = 200, maximum = 100)
+    progress_bar.grid(row = 1, column = 0, columnspan = 2, sticky = 'w')
+    
+    jobs_list = tk.Listbox(calc_frame, height = 4, width = 40)
+    jobs_list.grid(row = 2, column = 0, columnspan = 2, sticky = 'w')
+    
+    cancel_button = tk.Button(calc_frame, text = 'Cancel', command = cancel_job)
+    cancel_button.grid(row = 3, column = 0, sticky = 'w')
+    
+    status_label = tk.Label(calc_frame)
+    status_label.grid(row = 4, column = 0, columnspan = 2, sticky = 'w')
+    status_label.config(wraplength=300)
+    
+    calc_frame.pack()
+    
+    # Plot
+    # Label to select type of plot
+    plottings = tk.Frame(plot_window)
+    
+    type_plot_label = tk.Label(plottings, text="Plot type:")
+    type_plot_label.grid(row = 0, column = 0)
+    type_plot = tk.OptionMenu(plottings, opts_dict["type_plot"], *type_options)
+    type_plot.grid(row = 0, column = 1)
+    
+    # call the modified function to get the Figure instance
+    plot_button = tk.Button(plottings, text = 'Plot', command = lambda: plot_on_canvas(canvas, opts_dict))
+    plot_button.grid(row = 0, column = 2)
+    
+    plottings.pack()
+    
+    # Plot Canvas
+    canvas_frame = tk.Frame(plot_window, border = 20)
+    
+    canvas = tk.Canvas(canvas_frame, width=800, height=400, bg = 'white')
+    canvas.pack_propagate(0)
+    canvas.pack()
+    canvas_frame.pack()
+    
+    #Pop ups
+    pop_ups = tk.Frame(plot_window, border = 50)
+    
+    # Voltage and sizing criteria
+    def update_criteria(event):
+        update_voltage(voltage_criteria, mods_entry.get(),module_selector.get(),inverter_selector.get())
+        update_sizing(inverter_criteria, module_selector.get(), inverter_selector.get(), mods_entry.get(), strings_entry.get())
+    
+    #Voltage criteria
+    voltage_criteria = tk.Label(pop_ups)
+    update_voltage(voltage_criteria, mods_entry.get(),module_selector.get(),inverter_selector.get())
+
+    voltage_criteria.grid(row = 0, column = 0, sticky = 'w')
+    voltage_criteria.config(wraplength=400)
+    
+    # Inverter criteria
+    inverter_criteria = tk.Label(pop_ups)
+    update_sizing(inverter_criteria, module_selector.get(), inverter_selector.get(), mods_entry.get(), strings_entry.get())
+    
+    
+    inverter_criteria.grid(row = 1, column = 0, sticky = 'w')
+    inverter_criteria.config(wraplength=400)
+    
+    mods_entry.bind("<FocusOut>", update_criteria)
+    strings_entry.bind("<FocusOut>", update_criteria)
+    module_selector.bind("<FocusOut>", update_criteria)
+    inverter_selector.bind("<FocusOut>", update_criteria)
+    
+    pop_ups.pack()
+    
+    #Results window
+    total = tk.Frame(results_window, border = 50)
+    # Energy
+    energy_label = tk.Label(total, text = 'Total energy: ')
+    energy_label.grid(row = 0, column = 0, sticky = 'w')
+    
+    energy_value_label = tk.Label(total, textvariable = results_dict['energy'])
+    energy_value_label.grid(row = 0, column = 1, sticky = 'w')
+    
+    energy_units_label = tk.Label(total, text = 'MWh')
+    energy_units_label.grid(row = 0, column = 2, sticky = 'w')
+    
+    # Yield
+    yield_label = tk.Label(total, text = 'Yield: ')
+    yield_label.grid(row = 1, column = 0, sticky = 'w')
+    
+    yield_value_label = tk.Label(total, textvariable = results_dict['yield'])
+    yield_value_label.grid(row = 1, column = 1, sticky = 'w')
+    
+    yield_units_label = tk.Label(total, text = 'kWh/kWp')
+    yield_units_label.grid(row = 1, column = 2, sticky = 'w')
+    
+    # Bifacial gains
+    bifacial_label = tk.Label(total, text = 'Bifacial Gains: ')
+    bifacial_label.grid(row = 2, column = 0, sticky = 'w')
+    
+    bifacial_value_label = tk.Label(total, textvariable = results_dict['bifacial gains'])
+    bifacial_value_label.grid(row = 2, column = 1, sticky = 'w')
+    
+    bifacial_units_label = tk.Label(total, text = '%')
+    bifacial_units_label.grid(row = 2, column = 2, sticky = 'w')
+    
+    #Performance Ratio
+    pr_label = tk.Label(total, text = 'Bifacial Performance Ratio: ')
+    pr_label.grid(row = 3, column = 0, sticky = 'w')
+    
+    pr_value_label = tk.Label(total, textvariable = results_dict['pr'])
+    pr_value_label.grid(row = 3, column = 1, sticky = 'w')
+    
+    pr_units_label = tk.Label(total, text = 'pu')
+    pr_units_label.grid(row = 3, column = 2, sticky = 'w')
+    
+    #Installed power
+    power_label = tk.Label(total, text = 'Installed Power: ')
+    power_label.grid(row = 4, column = 0, sticky = 'w')
+    
+    power_value_label = tk.Label(total, textvariable = results_dict['installed power'])
+    power_value_label.grid(row = 4, column = 1, sticky = 'w')
+    
+    power_units_label = tk.Label(total, text = 'kWp')
+    power_units_label.grid(row = 4, column = 2, sticky = 'w')
+    
+    total.pack()
+    
+    # Loss diagram
+    
+    loss_diagram = tk.Frame(results_window, border = 50)
+    
+    # Solar resource
+    solar_resource_label = tk.Label(loss_diagram, text = 'Solar resource: ')
+    solar_resource_label.grid(row = 0, column = 0, sticky = 'w')
+    
+    solar_resource_value_label = tk.Label(loss_diagram, textvariable = results_dict['Solar resource'])
+    solar_resource_value_label.grid(row = 0, column = 1, sticky = 'w')
+    
+    solar_resource_units_label = tk.Label(loss_diagram, text = 'kWh/m2')
+    solar_resource_units_label.grid(row = 0, column = 2, sticky = 'w')
+    
+    # Incident irradiance
+    irradiance_label = tk.Label(loss_diagram, text = 'Incident irradiance: ')
+    irradiance_label.grid(row = 1, column = 0, sticky = 'w')
+    
+    irradiance_value_label = tk.Label(loss_diagram, textvariable = results_dict['Incident irradiance'])
+    irradiance_value_label.grid(row = 1, column = 1, sticky = 'w')
+    
+    irradiance_units_label = tk.Label(loss_diagram, text = 'kWh/m2')
+    irradiance_units_label.grid(row = 1, column = 2, sticky = 'w')
+    
+    # Incident irradiance
+    array_energy_label = tk.Label(loss_diagram, text = 'Array energy: ')
+    array_energy_label.grid(row = 2, column = 0, sticky = 'w')
+    
+    array_energy_value_label = tk.Label(loss_diagram, textvariable = results_dict['Array energy'])
+    array_energy_value_label.grid(row = 2, column = 1, sticky = 'w')
+    
+    array_energy_units_label = tk.Label(loss_diagram, text = 'MWh DC')
+    array_energy_units_label.grid(row = 2, column = 2, sticky = 'w')
+    
+    # Inverter energy
+    inverter_energy_label = tk.Label(loss_diagram, text = 'Inverter energy: ')
+    inverter_energy_label.grid(row = 3, column = 0, sticky = 'w')
+    
+    inverter_energy_value_label = tk.Label(loss_diagram, textvariable = results_dict['Inverter energy'])
+    inverter_energy_value_label.grid(row = 3, column = 1, sticky = 'w')
+    
+    inverter_energy_units_label = tk.Label(loss_diagram, text = 'MWh AC')
+    inverter_energy_units_label.grid(row = 3, column = 2, sticky = 'w')
+    
+    loss_diagram.pack()
+    
+    # Timing of the last run, stage by stage
+    profile_frame = tk.Frame(results_window, border = 20)
+    
+    profile_label = tk.Label(profile_frame, text = 'No run yet', justify = 'left')
+    profile_label.grid(row = 0, column = 0, sticky = 'w')
+    
+    profile_button = tk.Button(profile_frame, text = 'Save profile', command = save_profile)
+    profile_button.grid(row = 1, column = 0, sticky = 'w')
+    
+    profile_frame.pack()
+    
+    
+    # Save results button
+    save_button = tk.Button(results_window, text = 'Save results', command = save_results)
+    save_button.pack()
+    
+    # Keep the hourly results of the run for later comparison
+    archive_button = tk.Button(results_window, text = 'Store hourly results', command = archive_results)
+    archive_button.pack()
+    
+    
+    # Place main Frame and run mainloop
+    options_window.grid(row = 0, column = 0)
+    plot_window.grid(row = 0, column = 1)
+    results_window.grid(row = 0, column = 2)
+    root.protocol('WM_DELETE_WINDOW', close)
+    root.after(100, poll_jobs)
+    root.mainloop()
+
+####################################################################################################
+# Functions
+
+def plot_on_canvas(frame, opts_dict):
+    
+    profiler = Profiler()
+    with profiler.stage('plot'):
+        draw_plot(frame, opts_dict)
+    
+    # The plot time goes with the run it shows
+    if 'last_profile' in globals():
+        last_profile['stages'] = [record for record in last_profile['stages']
+                                  if record['stage'] != 'plot'] + profiler.stages
+        show_profile()
+    
+def draw_plot(frame, opts_dict):
+    
+    # matplotlib loads with the first plot, not with the window
+    from .plotting import plot_aggregates, figure_canvas
+    
+    # Remove any previous plot from the frame
+    for widget in frame.winfo_children():
+        widget.destroy()    
+    
+    fig = plot_aggregates(aggregates, opts_dict['type_plot'].get())
+
+    # Get the Tkinter widget for the figure
+    canvas_widget = figure_canvas(fig, frame)
+    
+    # Pack the canvas widget inside the frame
+    canvas_widget.pack(side="top", fill="both", expand=True)
+    
+    # Set the row and column of the frame to expand with window size changes
+    frame.grid_rowconfigure(0, weight=1)
+    frame.grid_columnconfigure(0, weight=1)
+
+# Queue a job on the worker thread, on_done(value) runs back in the Tk thread
+def submit_job(name, function, on_done, on_error = None):
+    
+    job = {'name': name, 'status': 'queued', 'cancel': threading.Event(),
+           'on_done': on_done, 'on_error': on_error}
+    job['future'] = executor.submit(run_job, job, function)
+    jobs.append(job)
+    refresh_jobs()
+    
+def run_job(job, function):
+    progress_queue.put((job, 'running', 0))
+    return function(job)
+
+def refresh_jobs():
+    jobs_list.delete(0, tk.END)
+    for job in jobs:
+        jobs_list.insert(tk.END, f"{job['name']}: {job['status']}")
+
+# Cancel the selected job, or the oldest one
+def cancel_job():
+    
+    selection = jobs_list.curselection()
+    if not jobs:
+        return
+    job = jobs[selection[0]] if selection else jobs[0]
+    
+    # Queued jobs are dropped, a running model stops at its next stage
+    job['cancel'].set()
+    job['future'].cancel()
+    job['status'] = 'cancelling'
+    refresh_jobs()
+    
+def poll_jobs():
+    
+    # Progress reported by the worker
+    while True:
+        try:
+            job, status, fraction = progress_queue.get_nowait()
+        except queue.Empty:
+            break
+        if not job['cancel'].is_set():
+            job['status'] = status
+        progress_bar['value'] = 100 * fraction
+    
+    # Hand finished jobs back to the GUI
+    for job in [job for job in jobs if job['future'].done()]:
+        jobs.remove(job)
+        if job['future'].cancelled():
+            status_label.config(text = f"{job['name']} cancelled.")
+            continue
+        try:
+            value = job['future'].result()
+        except Cancelled:
+            status_label.config(text = f"{job['name']} cancelled.")
+        except Exception as error:
+            if job['on_error'] is not None:
+                job['on_error'](error)
+            else:
+                status_label.config(text = f"{job['name']} failed: {error}")
+        else:
+            progress_bar['value'] = 100
+            status_label.config(text = f"{job['name']} done.")
+            job['on_done'](value)
+    
+    refresh_jobs()
+    root.after(100, poll_jobs)
+    
+def close():
+    for job in jobs:
+        job['cancel'].set()
+    executor.shutdown(wait = False, cancel_futures = True)
+    root.destroy()
+
+def calc_model():
+    
+    # Read the inputs in the Tk thread, the model runs on the worker
+    try:
+        config = SimulationConfig.from_dict({key: value.get() for key, value in opts_dict.items()})
+    except ValueError as error:
+        status_label.config(text = f'Invalid input: {error}')
+        return
+    
+    def run(job):
+        if 'data' not in globals():
+            raise RuntimeError('load the TMY data first')
+        def progress(stage, index, total):
+            progress_queue.put((job, stage, index / total))
+        return pipeline.run(config, data, progress = progress, cancel = job['cancel'])
+    
+    submit_job(f'Calculate ({config.tracking}, gcr {config.gcr})', run, show_results)
+    
+def show_results(result):
+    
+    global results, results_dc, irrad, aggregates
+    
+    results = result.results
+    results_dc = result.results_dc
+    irrad = result.irrad
+    aggregates = result.aggregates
+    
+    #Update total results and loss diagram
+    for key, value in result.summary.items():
+        results_dict[key].set(round(value, 2))
+    
+    global last_profile, last_result
+    last_profile = result.profile
+    last_result = result
+    show_profile()
+
+def show_profile():
+    last_profile['total_seconds'] = sum(record['seconds'] for record in last_profile['stages'])
+    profile_label.config(text = format_report(last_profile))
+
+# Save the timing report of the last run
+def save_profile():
+    
+    if 'last_profile' not in globals():
+        return
+    file_path = filedialog.asksaveasfilename(defaultextension='.json')
+    if file_path:
+        with open(file_path, 'w') as f:
+            json.dump(last_profile, f, indent = 2)
+
+# Save total results
+def save_results():
+    
+    global df_results
+    df_results = pd.DataFrame({})
+    df_results = aggregates.total_results().T
+    df_results = df_results.rename(columns = {0: 'Value'})
+    df_results['units'] = total_units
+    
+    metadata = {}
+    for key, value in opts_dict.items():
+        metadata[key] = value.get()
+        
+    metadata_df = pd.DataFrame.from_dict(metadata, orient='index', columns=['Value'])
+    df_results = pd.concat([df_results, metadata_df])
+    file_path = filedialog.asksaveasfilename(defaultextension='.csv')
+    df_results.to_csv(file_path, index = True)
+    
+# Hourly results to the results store, on the worker
+def archive_results():
+    
+    if 'last_result' not in globals():
+        return
+    result = last_result
+    submit_job('Store hourly results', lambda job: save_result(result), 
+               lambda key: status_label.config(text = f'Hourly results stored as {key}.'))
+    
+# Solar resource graph
+def calc_solar_resource(label):
+    
+    latitude = opts_dict['latitude'].get()
+    longitude = opts_dict['longitude'].get()
+    
+    # Set on the worker, so calculations queued after it already see the new data
+    def run(job):
+        global data, months_selected, inputs, metadata
+        data, months_selected, inputs, metadata = get_tmy(latitude, longitude)
+    
+    def on_error(error):
+        import requests
+        if isinstance(error, requests.exceptions.HTTPError):
+            label.config(text = 'Invalid location!')
+        elif isinstance(error, (requests.exceptions.ConnectionError, TMYNotCached)):
+            label.config(text = 'No connection and location not cached!')
+        else:
+            label.config(text = f'Loading failed: {error}')
+    
+    label.config(text = 'Loading...')
+    submit_job(f'Load Data ({latitude}, {longitude})', run,
+               lambda value: label.config(text = 'TMY data saved.'), on_error)
+    
+# Local weather file (EPW, TMY3, PVGIS CSV, CSV or Parquet series)
+def load_weather_file(label):
+    
+    path = filedialog.askopenfilename(filetypes = [('Weather files', '*.epw *.csv *.parquet'),
+                                                   ('All files', '*.*')])
+    if not path:
+        return
+    
+    def run(job):
+        global data, months_selected, inputs, metadata
+        data, metadata = load_weather(path)
+        months_selected = metadata.get('months_selected')
+        inputs = metadata
+        return metadata
+    
+    # Files with a site move the location to it
+    def on_done(meta):
+        if 'latitude' in meta:
+            opts_dict['latitude'].set(round(meta['latitude'], 2))
+            opts_dict['longitude'].set(round(meta['longitude'], 2))
+        label.config(text = f'{os.path.basename(path)} loaded.')
+    
+    label.config(text = 'Loading...')
+    submit_job(f'Load File {os.path.basename(path)}', run, on_done,
+               lambda error: label.config(text = f'Loading failed: {error}'))
+    
+def open_params(my_module):
+    
+    global module_parameters
+    module_parameters = my_module.to_dict()  
+    
+    module_params_window = tk.Tk()
+    module_params_window.title(my_module.name)
+    module_params_window.geometry("800x400")
+    
+    # Create treeview
+    module_params = ttk.Treeview(module_params_window)
+    module_params['columns'] = ('Index', 'Value')
+    module_params['show'] = 'headings'
+    module_params.insert("", "end", values=('Name', my_module.name))
+    module_params.heading('Index', text='Index')
+    module_params.heading('Value', text='Value')
+    
+    # Insert dictionary items into the Treeview
+    for key, value in module_parameters.items():
+        module_params.insert('', 'end', values=(key, value))
+        
+    # Configure column weights to dynamically adjust the size
+    module_params.column('Index', width=100, anchor='center')
+    module_params.column('Value', width=100, anchor='center')
+    module_params.grid(sticky='nsew')
+    
+    # Configure the window to adjust its size based on the content
+    module_params_window.grid_rowconfigure(0, weight=1)
+    module_params_window.grid_columnconfigure(0, weight=1)
+    module_params_window.mainloop()
+    
+def update_voltage(label, n_modules, my_module, my_inverter):
+    label.config(text = voltage_check(my_module, my_inverter, int(n_modules)))
+    
+def update_sizing(label, my_module, my_inverter, n_rows, n_cols):
+    label.config(text = sizing_check(my_module, my_inverter, int(n_rows), int(n_cols)))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Front and rear irradiance stage of the Bifacial Tool model.
+
+Two models are available: 'pvfactors', the full 2-D view-factor solve of
+three rows, and 'infinite_sheds', pvlib's vectorized infinite-sheds model,
+which works on whole arrays of timestamps at once and is much faster for
+sub-hourly or multi-year weather.
+
+The pvfactors scene has three rows and one solve gives the irradiance of all
+of them: the first and last (edge) rows and the interior one are kept
+together, so every row position of a geometry shares one cached solve, and
+'field' weights them by the number of rows of the field.
+
+The albedo can vary in time (monthly values, snow, a measured series). The
+series goes straight to the model, one exact solve keyed by its values. The
+Monte Carlo, which draws many albedos for one geometry, uses a linear albedo
+basis of two solves instead.
+
+The view-factor solve is by far the slowest step of a run, so its output is
+memoized under a hash of everything it depends on: timestamps, solar position,
+surface orientation, GHI/DNI/DHI and the row geometry. Results live in a small
+in-memory LRU and in an on-disk store shared between processes, so changing
+only the electrical side of a plant reuses the last solve.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import hashlib
+import json
+import os
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import store
+
+# supressing shapely warnings that occur on import of pvfactors
+warnings.filterwarnings(action='ignore', module='pvfactors')
+
+irradiance_models = ['pvfactors', 'infinite_sheds']
+
+# Rows of the three-row pvfactors scene: an edge row sees more of the sky and
+# the lit ground behind it than an interior one. Infinite sheds has no edges,
+# every position gets the interior value. 'field' is the mean row of a field
+# of n_rows rows, two edge rows and n_rows - 2 interior ones
+row_positions = {'first': 0, 'interior': 1, 'last': 2}
+row_options = list(row_positions) + ['field']
+
+# pvlib's default pvfactors row reflectivities, used to turn the infinite
+# sheds incident irradiance into absorbed irradiance
+rho_front_pvrow = 0.03
+rho_back_pvrow = 0.05
+horizon_band_angle = 15
+
+irradiance_columns = ['total_inc_front', 'total_inc_back', 'total_abs_front', 'total_abs_back']
+
+# Cache tiers
+memory_entries = 32
+disk_cache_size = int(os.environ.get('BIFACIAL_TOOL_IRRAD_CACHE_MB', 1000)) * 2**20
+_memory = OrderedDict()
+
+
+def irradiance_key(solar_position, orientation, data, **params):
+    """Hash of the time series and parameters the irradiance depends on."""
+
+    h = hashlib.sha1()
+    h.update(data.index.asi8.tobytes())
+    for series in (solar_position['azimuth'], solar_position['apparent_zenith'],
+                   orientation['surface_azimuth'], orientation['surface_tilt'],
+                   data['ghi'], data['dni'], data['dhi']):
+        h.update(np.ascontiguousarray(series, dtype='float64').tobytes())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def cached(key, compute):
+    """Return the frame stored under `key`, calling compute() on a miss."""
+
+    if key in _memory:
+        _memory.move_to_end(key)
+        return _memory[key].copy()
+
+    root = store.cache_root('irradiance')
+    path = os.path.join(root, key)
+    irrad = None
+    if store.exists(path):
+        try:
+            irrad = store.load_frame(path)[0]
+        except (OSError, KeyError):
+            # Replaced or evicted by another process meanwhile
+            pass
+    if irrad is None:
+        irrad = compute()
+        store.save_frame(path, irrad)
+        store.evict(root, disk_cache_size)
+
+    _memory[key] = irrad
+    if len(_memory) > memory_entries:
+        _memory.popitem(last=False)
+    return irrad.copy()
+
+
+def clear_memory():
+    _memory.clear()
+
+
+def pvfactors_irradiance(solar_position, orientation, data, gcr, row_height,
+                         row_width, albedo, axis_azimuth):
+    """Irradiance of every row of one pvfactors solve.
+
+    Same solve as pvlib's pvfactors_timeseries, but the report keeps the
+    three rows: columns are '<irradiance column> <row position>'.
+    """
+
+    from pvfactors.run import run_timeseries_engine
+
+    pvarray_parameters = {'n_pvrows': len(row_positions),
+                          'axis_azimuth': axis_azimuth,
+                          'pvrow_height': row_height,
+                          'pvrow_width': row_width,
+                          'gcr': gcr}
+    irradiance_model_params = {'rho_front': rho_front_pvrow,
+                               'rho_back': rho_back_pvrow,
+                               'horizon_band_angle': horizon_band_angle}
+
+    def fn_build_report(pvarray):
+        report = {}
+        for position, index in row_positions.items():
+            pvrow = pvarray.ts_pvrows[index]
+            report[f'total_inc_front {position}'] = pvrow.front.get_param_weighted('qinc')
+            report[f'total_inc_back {position}'] = pvrow.back.get_param_weighted('qinc')
+            report[f'total_abs_front {position}'] = pvrow.front.get_param_weighted('qabs')
+            report[f'total_abs_back {position}'] = pvrow.back.get_param_weighted('qabs')
+        return report
+
+    # A fixed mount has one orientation, pvfactors wants one per timestamp
+    shape = (len(data.index),)
+    surface_tilt = np.broadcast_to(np.asarray(orientation['surface_tilt'], dtype='float64'), shape)
+    surface_azimuth = np.broadcast_to(np.asarray(orientation['surface_azimuth'], dtype='float64'), shape)
+
+    report = run_timeseries_engine(fn_build_report, pvarray_parameters,
+                                   timestamps = data.index,
+                                   dni = np.asarray(data['dni'], dtype='float64'),
+                                   dhi = np.asarray(data['dhi'], dtype='float64'),
+                                   solar_zenith = np.asarray(solar_position['apparent_zenith'], dtype='float64'),
+                                   solar_azimuth = np.asarray(solar_position['azimuth'], dtype='float64'),
+                                   surface_tilt = surface_tilt,
+                                   surface_azimuth = surface_azimuth,
+                                   albedo = albedo,
+                                   irradiance_model_params = irradiance_model_params)
+
+    return pd.DataFrame(report, index = data.index)
+
+
+def row_irradiance(rows, row_position, n_rows=3):
+    """Irradiance of one row position out of an all-rows pvfactors frame."""
+
+    if row_position == 'field':
+        if n_rows < 2:
+            raise ValueError(f'A field has at least 2 rows, got {n_rows}')
+        weights = {'first': 1, 'interior': n_rows - 2, 'last': 1}
+    else:
+        weights = {row_position: 1}
+
+    irrad = sum(rows[[f'{column} {position}' for column in irradiance_columns]].to_numpy() * weight
+                for position, weight in weights.items()) / sum(weights.values())
+    return pd.DataFrame(irrad, index = rows.index, columns = irradiance_columns)
+
+
+def infinite_sheds_irradiance(solar_position, orientation, data, gcr, row_height,
+                              row_width, albedo):
+    """Irradiance of an infinite row, pvlib's infinite sheds model.
+
+    Only the hours with the sun up are solved, as NumPy arrays; the view
+    factors of night hours are half the work and give no irradiance. The sky
+    diffuse is Hay-Davies, which keeps the circumsolar part pvfactors' Perez
+    sky has and the isotropic sky spreads over the dome.
+    """
+
+    from pvlib import irradiance
+    from pvlib.bifacial import infinite_sheds
+
+    day = np.asarray(solar_position['apparent_zenith'], dtype='float64') < 90
+
+    def daytime(values):
+        values = np.asarray(values, dtype='float64')
+        return values[day] if values.ndim else values
+
+    # Rows are lying flat at night when a tracker has no angle. A fixed mount
+    # gives plain floats
+    surface_tilt = np.nan_to_num(daytime(orientation['surface_tilt']), nan=0)
+    surface_azimuth = np.nan_to_num(daytime(orientation['surface_azimuth']), nan=180)
+    irrad = infinite_sheds.get_irradiance(surface_tilt,
+                                          surface_azimuth,
+                                          daytime(solar_position['apparent_zenith']),
+                                          daytime(solar_position['azimuth']),
+                                          gcr,
+                                          row_height,
+                                          row_width / gcr,
+                                          daytime(data['ghi']),
+                                          daytime(data['dhi']),
+                                          daytime(data['dni']),
+                                          daytime(albedo),
+                                          model = 'haydavies',
+                                          dni_extra = daytime(irradiance.get_extra_radiation(data.index)))
+
+    front = np.zeros(len(data.index))
+    back = np.zeros(len(data.index))
+    front[day] = np.nan_to_num(irrad['poa_front'])
+    back[day] = np.nan_to_num(irrad['poa_back'])
+
+    return pd.DataFrame({'total_inc_front': front,
+                         'total_inc_back': back,
+                         'total_abs_front': front * (1 - rho_front_pvrow),
+                         'total_abs_back': back * (1 - rho_back_pvrow)},
+                        index = data.index)
+
+
+def get_irradiance(solar_position, orientation, data, gcr, row_height, row_width,
+                   albedo, axis_azimuth, model='pvfactors', cache=True, row_position='interior',
+                   n_rows=3):
+    """Front/rear irradiance (total_abs_front, total_abs_back...) of one row.
+
+    `row_position` is 'interior' (the middle row), 'first' or 'last' for the
+    edge rows, or 'field' for the mean row of a field of `n_rows` rows. All
+    positions come from the same pvfactors solve.
+
+    `albedo` is a float or one value per timestamp. A varying albedo is
+    passed to the model as is, and keyed by its hash when cached: both models
+    cost the same for any number of distinct albedo values.
+    """
+
+    albedo_key = albedo
+    if np.ndim(albedo):
+        albedo = np.asarray(albedo, dtype='float64')
+        albedo_key = hashlib.sha1(albedo.tobytes()).hexdigest()
+
+    params = {'gcr': gcr, 'row_height': row_height, 'row_width': row_width,
+              'albedo': albedo}
+
+    if row_position not in row_options:
+        raise ValueError(f'Unknown row position {row_position!r}, expected one of {row_options}')
+
+    if model == 'pvfactors':
+        def compute():
+            return pvfactors_irradiance(solar_position, orientation, data,
+                                        axis_azimuth=axis_azimuth, **params)
+        params_key = dict(params, albedo=albedo_key, model=model, axis_azimuth=axis_azimuth,
+                          n_pvrows=len(row_positions), report='rows')
+
+    elif model == 'infinite_sheds':
+        def compute():
+            return infinite_sheds_irradiance(solar_position, orientation, data, **params)
+        params_key = dict(params, albedo=albedo_key, model=model)
+
+    else:
+        raise ValueError(f'Unknown irradiance model {model!r}, expected one of {irradiance_models}')
+
+    if not cache:
+        irrad = compute()
+    else:
+        irrad = cached(irradiance_key(solar_position, orientation, data, **params_key), compute)
+
+    # One cached pvfactors solve serves every row position
+    if model == 'pvfactors':
+        irrad = row_irradiance(irrad, row_position, n_rows)
+    return irrad
+
+
+# Albedos of the two solves of an albedo basis
+basis_albedos = (0.1, 0.5)
+
+
+def albedo_basis(solar_position, orientation, data, gcr, row_height, row_width,
+                 axis_azimuth, model='pvfactors', cache=True, row_position='interior',
+                 n_rows=3):
+    """Irradiance at albedo 0 and its change per unit of albedo, (base, slope).
+
+    The ground-reflected part of the irradiance is proportional to the
+    albedo: exactly for infinite sheds, and very nearly for pvfactors, where
+    only the second reflections between rows and ground add a small curvature.
+    Two cached solves then give any albedo as base + albedo * slope, which is
+    worth it where many albedos reuse them, as in the Monte Carlo. For
+    pvfactors this is an approximation, exact at the basis albedos.
+    """
+
+    low, high = (get_irradiance(solar_position, orientation, data, gcr, row_height, row_width,
+                                albedo, axis_azimuth, model, cache, row_position, n_rows)
+                 for albedo in basis_albedos)
+    slope = (high - low) / (basis_albedos[1] - basis_albedos[0])
+    return low - basis_albedos[0] * slope, slope
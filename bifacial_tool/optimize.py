@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Layout optimization of the Bifacial Tool model.
+
+Searches gcr, panel tilt and row height, for every tracking mode, for the
+layout maximizing the annual energy, the yield or the bifacial weighted PR.
+The search is a Nelder-Mead simplex evaluating its reflection, expansion and
+both contractions as one parallel batch, so every iteration costs a single
+round trip to the process pool.
+
+Candidate points are rounded to a fixed resolution (0.01 gcr, 1 degree,
+0.05 m) before running, so nearby evaluations collapse on the same config:
+repeated points are never re-run and the irradiance stage of a layout
+already seen comes from the irradiance cache.
+
+Land use is bounded with the row pitch: a minimum pitch caps the gcr and a
+maximum pitch (the land available per row) floors it.
+
+    python -m bifacial_tool.optimize --latitude 40.45 --longitude -3.73 --objective Yield
+                                     --tracking Backtrack "Fixed tilt" --max-pitch 12
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, replace
+import numpy as np
+import pandas as pd
+from .engine import SimulationConfig, get_solar_position, track_options
+from .sweep import init_worker, run_point
+
+objectives = ['Energy', 'Yield', 'Bifacial PR']
+
+# Search ranges and rounding of every parameter
+default_bounds = {'gcr': (0.2, 0.8), 'pannel_tilt': (0.0, 60.0), 'row_height': (0.5, 4.0)}
+resolution = {'gcr': 0.01, 'pannel_tilt': 1.0, 'row_height': 0.05}
+
+# Trackers set their own tilt
+mode_parameters = {'Track': ['gcr', 'row_height'],
+                   'Backtrack': ['gcr', 'row_height'],
+                   'Fixed tilt': ['gcr', 'pannel_tilt', 'row_height']}
+
+
+def objective_value(row, objective):
+    """Objective of one evaluated point, larger is better."""
+
+    if objective == 'Bifacial PR':
+        return row['PR'] * (1 + row['Bifacial gains'] / 100)
+    return row[objective]
+
+
+def land_bounds(config, bounds, min_pitch=None, max_pitch=None):
+    """gcr bounds narrowed to the allowed row pitch, pitch = row_width / gcr."""
+
+    bounds = dict(bounds)
+    low, high = bounds['gcr']
+    if max_pitch is not None:
+        low = max(low, config.row_width / max_pitch)
+    if min_pitch is not None:
+        high = min(high, config.row_width / min_pitch)
+    if low > high:
+        raise ValueError(f'No gcr between {bounds["gcr"]} meets the pitch limits')
+    bounds['gcr'] = (low, high)
+    return bounds
+
+
+class Optimizer:
+    """Batched Nelder-Mead over the layout of one site, sharing one process pool.
+
+    Every evaluated point is kept in `history`, one row per model run.
+    """
+
+    def __init__(self, base, pool, objective='Energy', bounds=None):
+        if objective not in objectives:
+            raise ValueError(f'Unknown objective {objective!r}, choose from {objectives}')
+        self.base = base
+        self.pool = pool
+        self.objective = objective
+        self.bounds = dict(default_bounds, **(bounds or {}))
+        self.history = []
+        self._seen = {}
+
+    def _config(self, tracking, names, u):
+        """Config of a point of the unit cube, rounded to the parameter resolution."""
+
+        values = {}
+        for name, value in zip(names, np.clip(u, 0, 1)):
+            low, high = self.bounds[name]
+            step = resolution[name]
+            value = min(max(round((low + value * (high - low)) / step) * step, low), high)
+            values[name] = round(value, 6)
+        return replace(self.base, tracking=tracking, **values)
+
+    def evaluate(self, configs):
+        """Objective of every config, running the new ones as one parallel batch."""
+
+        keys = [astuple(config) for config in configs]
+        pending = {}
+        for key, config in zip(keys, configs):
+            if key not in self._seen and key not in pending:
+                point = len(self.history) + len(pending)
+                pending[key] = self.pool.submit(run_point, point, config,
+                                                ['tracking'] + list(default_bounds))
+        for key, future in pending.items():
+            row = future.result()
+            row['objective'] = objective_value(row, self.objective)
+            self._seen[key] = row
+            self.history.append(row)
+        return np.array([self._seen[key]['objective'] for key in keys])
+
+    def search(self, tracking, parameters=None, max_evaluations=40, tol=1e-4):
+        """Best point of one tracking mode, as its history row."""
+
+        names = parameters or mode_parameters[tracking]
+        n = len(names)
+        start = len(self.history)
+
+        def run(points):
+            return -self.evaluate([self._config(tracking, names, u) for u in points])
+
+        # Initial simplex around the middle of the search ranges
+        simplex = np.vstack([np.full(n, 0.5)] + [np.full(n, 0.5) + 0.25 * np.eye(n)[i] for i in range(n)])
+        values = run(simplex)
+
+        # Rounded points are not re-run, so bound the iterations as well as the runs
+        for _ in range(2 * max_evaluations):
+            if len(self.history) - start >= max_evaluations:
+                break
+            order = np.argsort(values)
+            simplex, values = simplex[order], values[order]
+            configs = {astuple(self._config(tracking, names, u)) for u in simplex}
+            if len(configs) == 1 or values[-1] - values[0] <= tol * abs(values[0]):
+                break
+
+            centroid = simplex[:-1].mean(axis=0)
+            worst = simplex[-1]
+            reflected = centroid + (centroid - worst)
+            candidates = np.vstack([reflected,
+                                    centroid + 2 * (centroid - worst),
+                                    centroid + 0.5 * (reflected - centroid),
+                                    centroid + 0.5 * (worst - centroid)])
+            f_r, f_e, f_oc, f_ic = run(candidates)
+
+            if f_r < values[0]:
+                new = (candidates[1], f_e) if f_e < f_r else (candidates[0], f_r)
+            elif f_r < values[-2]:
+                new = (candidates[0], f_r)
+            elif f_r < values[-1] and f_oc <= f_r:
+                new = (candidates[2], f_oc)
+            elif f_r >= values[-1] and f_ic < values[-1]:
+                new = (candidates[3], f_ic)
+            else:
+                new = None
+
+            if new is not None:
+                simplex[-1], values[-1] = np.clip(new[0], 0, 1), new[1]
+            else:
+                # Shrink towards the best vertex
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = run(simplex[1:])
+
+        best = self._config(tracking, names, simplex[np.argmin(values)])
+        return self._seen[astuple(best)]
+
+
+def optimize(base, data, objective='Energy', tracking=None, bounds=None,
+             min_pitch=None, max_pitch=None, max_evaluations=40, processes=None):
+    """Best layout over the tracking modes and the history of every model run.
+
+    Returns (best, history): the best point's row and a table of every
+    evaluated point with its totals and objective.
+    """
+
+    bounds = land_bounds(base, dict(default_bounds, **(bounds or {})), min_pitch, max_pitch)
+
+    # Same site for every point, so the solar position is computed only once
+    solar_position = get_solar_position(base, data.index)
+
+    with ProcessPoolExecutor(max_workers=processes,
+                             initializer=init_worker,
+                             initargs=(data, solar_position)) as pool:
+        optimizer = Optimizer(base, pool, objective, bounds)
+        best = [optimizer.search(mode, max_evaluations=max_evaluations)
+                for mode in (tracking or track_options)]
+
+    best = max(best, key=lambda row: row['objective'])
+    history = pd.DataFrame(optimizer.history).set_index('point')
+    return best, history
+
+
+def main(argv=None):
+    from .weather import get_tmy
+
+    parser = argparse.ArgumentParser(description='Layout optimization of the bifacial model.')
+    parser.add_argument('--latitude', type=float, default=SimulationConfig.latitude)
+    parser.add_argument('--longitude', type=float, default=SimulationConfig.longitude)
+    parser.add_argument('--objective', default='Energy', choices=objectives)
+    parser.add_argument('--tracking', nargs='+', choices=track_options)
+    parser.add_argument('--gcr', type=float, nargs=2, metavar=('MIN', 'MAX'))
+    parser.add_argument('--tilt', type=float, nargs=2, metavar=('MIN', 'MAX'))
+    parser.add_argument('--row-height', type=float, nargs=2, metavar=('MIN', 'MAX'))
+    parser.add_argument('--min-pitch', type=float, help='minimum row pitch [m]')
+    parser.add_argument('--max-pitch', type=float, help='maximum row pitch, land per row [m]')
+    parser.add_argument('--max-evaluations', type=int, default=40, help='model runs per tracking mode')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--output', default='optimization.csv')
+    args = parser.parse_args(argv)
+
+    bounds = {key: tuple(values) for key, values in (('gcr', args.gcr),
+                                                     ('pannel_tilt', args.tilt),
+                                                     ('row_height', args.row_height))
+              if values}
+
+    base = SimulationConfig(latitude=args.latitude, longitude=args.longitude)
+    data = get_tmy(args.latitude, args.longitude)[0]
+
+    best, history = optimize(base, data, args.objective, args.tracking, bounds,
+                             args.min_pitch, args.max_pitch, args.max_evaluations, args.processes)
+    history.to_csv(args.output)
+    print(', '.join(f'{key}: {value}' for key, value in best.items() if key != 'point'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental recomputation of the Bifacial Tool model.
+
+The run is split in stages, each depending on a few config fields and on the
+stages before it:
+
+    weather -> solar position -> orientation -> irradiance -> electrical -> aggregates
+
+A Pipeline remembers the key and output of the last run of every stage and
+only re-runs the stages whose key changed, so editing e.g. the number of
+strings only re-runs the electrical and aggregates stages.
+
+A run can report its progress stage by stage and be cancelled between
+stages, which lets the GUI run it on a background thread. The time, rows and
+memory of every stage, run or cached, go to the result's `profile`.
+
+@author: Jesús
+"""
+
+# Libraries
+
+from .engine import (SimulationResult, get_solar_position, get_orientation, get_irradiance,
+                    run_electrical, aggregate, weather_key)
+from .profiling import Profiler, profiled
+
+stages = ['weather', 'solar_position', 'orientation', 'irradiance', 'electrical', 'aggregates']
+
+
+class Cancelled(Exception):
+    """Raised by Pipeline.run when its cancel event is set."""
+
+
+class Pipeline:
+    """Runs the engine stages, re-running a stage only when its inputs changed."""
+
+    def __init__(self):
+        self._cache = {}
+        self.executed = []
+        self._progress = None
+        self._cancel = None
+        self._profiler = None
+        self._rows = None
+
+    def invalidate(self, stage=None):
+        """Forget one stage, or every stage."""
+        if stage is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(stage, None)
+
+    def _stage(self, name, key, compute):
+        if self._cancel is not None and self._cancel.is_set():
+            raise Cancelled(name)
+        if self._progress is not None:
+            self._progress(name, stages.index(name), len(stages))
+
+        with self._profiler.stage(name, self._rows) as record:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == key:
+                record['cached'] = True
+                return key, cached[1]
+            value = compute()
+        self._cache[name] = (key, value)
+        self.executed.append(name)
+        return key, value
+
+    def run(self, config, data, solar_position=None, progress=None, cancel=None):
+        """Same as engine.run_simulation, re-using every stage still up to date.
+
+        The stages run this time are listed in `executed` afterwards.
+        progress(stage, index, total) is called before each stage, and the
+        run stops with Cancelled before the next stage once the
+        threading.Event `cancel` is set.
+        """
+
+        self.executed = []
+        self._progress = progress
+        self._cancel = cancel
+        self._profiler = Profiler()
+        self._rows = len(data)
+        with profiled():
+            return self._run(config, data, solar_position)
+
+    def _run(self, c, data, solar_position):
+
+        weather, _ = self._stage('weather', weather_key(data), lambda: None)
+
+        key = (weather, c.latitude, c.longitude)
+        if solar_position is not None:
+            self._cache['solar_position'] = (key, solar_position)
+        key_sp, solar_position = self._stage('solar_position', key,
+                                             lambda: get_solar_position(c, data.index))
+
+        # The row spacing only moves trackers, fixed rows only care about tilt and azimuth
+        if c.tracking == 'Fixed tilt':
+            key = (key_sp, c.tracking, c.pannel_tilt, c.pannel_azimuth)
+        else:
+            key = (key_sp, c.tracking, c.gcr, c.axis_tilt, c.axis_azimuth, c.max_angle)
+        key_or, orientation = self._stage('orientation', key,
+                                          lambda: get_orientation(c, solar_position))
+
+        key = (key_or, weather, c.gcr, c.row_height, c.row_width, c.albedo, c.irradiance_model,
+               c.axis_azimuth, c.row_position, c.n_rows if c.row_position == 'field' else None)
+        key_irr, irrad = self._stage('irradiance', key,
+                                     lambda: get_irradiance(c, solar_position, orientation, data))
+
+        key = (key_irr, c.module, c.inverter, c.modules_per_string, c.strings, c.bifaciality)
+        key_el, (results, results_dc) = self._stage('electrical', key,
+                                                    lambda: run_electrical(c, irrad))
+
+        key = (key_el, weather)
+        _, aggregates = self._stage('aggregates', key,
+                                    lambda: aggregate(c, results, results_dc, irrad, data))
+
+        # Stage outputs stay untouched for the next run
+        irrad = irrad.assign(effective_irradiance=results['effective irradiance'])
+
+        return SimulationResult(c, results, results_dc, irrad, aggregates, self._profiler.report(),
+                                weather)
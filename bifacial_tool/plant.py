@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-inverter plant model of the Bifacial Tool.
+
+A plant is a base SimulationConfig and a list of blocks: an inverter with its
+strings, a count, and the config fields that set this block type apart
+(inverter, modules per string, strings, gcr...). Blocks on the first or last
+row of the field see more rear irradiance than interior ones, so each block
+type can say how many of its blocks sit on an edge row; those become block
+types of their own, simulated with the pvfactors edge row. The three rows
+come out of one cached pvfactors solve, so edge rows add electrical runs but
+no view-factor solve.
+
+Every distinct block type is simulated once and the results are scaled by
+their count, so a 100 MW plant with a few hundred inverters costs as many
+runs as it has distinct block types.
+
+    python -m bifacial_tool.plant plant.yaml -o blocks.csv
+
+plant.yaml:
+
+    plant: {latitude: 40.45, longitude: -3.73, tracking: Backtrack, gcr: 0.4}
+    blocks:
+      - {name: A, count: 120, strings: 20, first_row: 4, last_row: 4}
+      - {name: B, count: 30, strings: 16, inverter: ...}
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import astuple, dataclass, field, fields, replace
+import pandas as pd
+from .aggregates import combine_aggregates
+from .engine import SimulationConfig, installed_power
+from .pipeline import Pipeline
+
+
+@dataclass
+class Block:
+    """`count` identical inverter blocks, `first_row` and `last_row` of them on an edge row."""
+
+    name: str
+    count: int = 1
+    config: dict = field(default_factory=dict)
+    first_row: int = 0
+    last_row: int = 0
+
+
+@dataclass
+class PlantResult:
+    """Plant aggregates, per block type results and number of simulations run."""
+
+    aggregates: object
+    blocks: pd.DataFrame
+    simulations: int
+
+    @property
+    def total_results(self):
+        return self.aggregates.total_results()
+
+
+def block_types(base, blocks):
+    """(name, row position, count, config) of every block type with blocks."""
+
+    names = {f.name for f in fields(SimulationConfig)}
+    types = []
+    for block in blocks:
+        if block.first_row + block.last_row > block.count:
+            raise ValueError(f'Block {block.name!r} has more edge row blocks than blocks')
+        for key in block.config:
+            if key not in names:
+                raise ValueError(f'Unknown field {key!r} in block {block.name!r}')
+        config = replace(base, **block.config)
+        for position, count in (('interior', block.count - block.first_row - block.last_row),
+                                ('first', block.first_row),
+                                ('last', block.last_row)):
+            if count > 0:
+                types.append((block.name, position, count, replace(config, row_position=position)))
+    return types
+
+
+def run_plant(base, blocks, data, progress=None):
+    """Simulate every distinct block type once and scale to the whole plant."""
+
+    types = block_types(base, blocks)
+
+    # Identical configs, e.g. two block names differing only in their count,
+    # share one run
+    unique = {}
+    for _, _, _, config in types:
+        unique.setdefault(astuple(config), config)
+
+    # Neighbouring runs share as many pipeline stages as possible: the
+    # geometry first, the electrical fields last
+    def order(config):
+        return (config.tracking, config.gcr, config.pannel_tilt, config.pannel_azimuth,
+                config.row_height, config.row_width, str(config.albedo), config.row_position)
+
+    pipeline = Pipeline()
+    results = {}
+    for i, config in enumerate(sorted(unique.values(), key=order)):
+        results[astuple(config)] = pipeline.run(config, data).aggregates
+        if progress is not None:
+            progress(i + 1, len(unique))
+
+    rows = []
+    parts = []
+    for name, position, count, config in types:
+        aggregates = results[astuple(config)]
+        dc_power = installed_power(config)
+        parts.append((aggregates, count, dc_power))
+        rows.append({'name': name, 'row_position': position, 'count': count,
+                     'inverter': config.inverter, 'modules_per_string': config.modules_per_string,
+                     'strings': config.strings,
+                     'block power': dc_power / 1000,
+                     'block energy': aggregates.annual['Energy'],
+                     'Energy': aggregates.annual['Energy'] * count,
+                     'Yield': aggregates.annual['Yield'],
+                     'Bifacial gains': aggregates.annual['Bifacial gains']})
+
+    return PlantResult(combine_aggregates(parts), pd.DataFrame(rows), len(unique))
+
+
+def read_plant(path):
+    """(base config, blocks) of a YAML or JSON plant file."""
+
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+
+    base = SimulationConfig.from_dict(content.get('plant') or {})
+    blocks = []
+    for i, values in enumerate(content['blocks']):
+        values = dict(values)
+        blocks.append(Block(name=str(values.pop('name', f'block_{i}')),
+                            count=int(values.pop('count', 1)),
+                            first_row=int(values.pop('first_row', 0)),
+                            last_row=int(values.pop('last_row', 0)),
+                            config={key.replace(' ', '_'): value for key, value in values.items()}))
+    return base, blocks
+
+
+def main(argv=None):
+    from .weather import get_tmy
+
+    parser = argparse.ArgumentParser(description='Multi-block plant simulation.')
+    parser.add_argument('plant', help='YAML or JSON with the plant config and its blocks')
+    parser.add_argument('-o', '--output', default='blocks.csv', help='per block type results')
+    args = parser.parse_args(argv)
+
+    base, blocks = read_plant(args.plant)
+    data = get_tmy(base.latitude, base.longitude)[0]
+
+    def progress(done, total):
+        print(f'{done}/{total} block types simulated', file=sys.stderr)
+
+    result = run_plant(base, blocks, data, progress)
+    result.blocks.to_csv(args.output, index=False)
+    for key, value in result.aggregates.annual.items():
+        print(f'{key}: {value:.2f}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
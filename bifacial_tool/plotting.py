@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Monthly result plots of the Bifacial Tool.
+
+matplotlib and its Tk backend are only imported with this module, which the
+GUI loads when it draws its first plot.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import matplotlib.pyplot as plt
+
+# Plot type: (monthly column, annual total, total units, y label, title)
+plot_types = {'Monthly Energy': ('energy', 'Energy', 'MWh', '[kWh]', 'Monthly energy generated'),
+              'Yield': ('yield', 'Yield', 'kWh/kWp', '[kWh/kWp]', 'Yield ratio'),
+              'Bifacial Gain': ('bifacial gain', 'Bifacial gains', '%', '[%]', 'Bifacial gains'),
+              'Performance Ratio': ('pr', 'PR', 'pu', '[%]', 'Bifacial Performance Ratio')}
+
+
+# Bar plot of one monthly aggregate with the annual total
+def plot_bars(monthly, text, ylabel, title):
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    monthly.plot(kind='bar', ax=ax)
+
+    # Print total
+    plt.text(0, 0, text, fontsize = 12, bbox=dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.5'))
+
+    # add the values to the top of each bar
+    for i in ax.containers:
+        ax.bar_label(i, label_type='edge', fmt = '%.2f')
+
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+
+    # plt.tight_layout()
+    return fig
+
+
+def plot_aggregates(aggregates, plot_type):
+    """Monthly bar plot of one of the plot_types."""
+
+    column, total, units, ylabel, title = plot_types[plot_type]
+    return plot_bars(aggregates.monthly[column],
+                     f'Total: {aggregates.annual[total]:.2f} {units}', ylabel, title)
+
+
+def figure_canvas(fig, master):
+    """Tk widget showing `fig` inside `master`."""
+
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    return FigureCanvasTkAgg(fig, master=master).get_tk_widget()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-site portfolio runs of one plant design.
+
+Each site's TMY comes from the PVGIS cache, the solar position of every site
+is computed in one NumPy pass over a (sites x hours) array, and the
+irradiance and electrical stages run in a process pool. The result is a
+table of Energy, Yield, Bifacial gains and PR per site, ranked best first.
+
+    python -m bifacial_tool.portfolio sites.csv --config plant.json -o ranking.csv
+
+sites.csv has latitude and longitude columns and an optional name column;
+plant.json (or .yaml) holds the SimulationConfig fields of the design.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+import numpy as np
+import pandas as pd
+from .engine import SimulationConfig, get_location, run_simulation
+from .weather import get_tmy
+
+total_fields = ['Energy', 'Yield', 'Bifacial gains', 'PR']
+
+# Same refraction and air temperature as Location.get_solarposition
+atmos_refract = 0.5667
+temperature = 12
+
+
+def solar_position_grid(times, latitudes, longitudes, altitudes=0):
+    """NREL SPA solar position of many sites sharing one time index.
+
+    The time-only terms (sidereal time, sun right ascension and declination,
+    earth-sun distance) are computed once and broadcast against the site
+    coordinates. Returns a dict of (sites, times) arrays: apparent_zenith,
+    zenith, apparent_elevation, elevation and azimuth, in degrees, matching
+    pvlib's spa_python.
+    """
+
+    from pvlib import atmosphere, solarposition, spa
+
+    latitudes = np.asarray(latitudes, dtype='float64').reshape(-1, 1)
+    longitudes = np.asarray(longitudes, dtype='float64').reshape(-1, 1)
+    altitudes = np.broadcast_to(np.asarray(altitudes, dtype='float64'), latitudes.shape[:1]).reshape(-1, 1)
+    pressure = atmosphere.alt2pres(altitudes) / 100
+
+    # Same delta T as the installed pvlib uses by default
+    delta_t = inspect.signature(solarposition.spa_python).parameters['delta_t'].default
+    if delta_t is None:
+        delta_t = spa.calculate_deltat(times.year, times.month)
+
+    utc = times.tz_convert('UTC') if times.tz is not None else times
+    unixtime = np.asarray(utc.tz_localize(None).to_numpy(dtype='datetime64[ns]').astype('int64') / 1e9)
+
+    # Terms that depend only on time
+    v, alpha, delta = spa.solar_position(unixtime, 0, 0, 0, 0, 0, delta_t, 0, 1, sst=True)
+    R = spa.solar_position(unixtime, 0, 0, 0, 0, 0, delta_t, 0, 1, esd=True)[0]
+
+    # Site terms, broadcast to (sites, times)
+    H = spa.local_hour_angle(v, longitudes, alpha)
+    xi = spa.equatorial_horizontal_parallax(R)
+    u = spa.uterm(latitudes)
+    x = spa.xterm(u, latitudes, altitudes)
+    y = spa.yterm(u, latitudes, altitudes)
+    delta_alpha = spa.parallax_sun_right_ascension(x, xi, H, delta)
+    delta_prime = spa.topocentric_sun_declination(delta, x, y, xi, delta_alpha, H)
+    H_prime = spa.topocentric_local_hour_angle(H, delta_alpha)
+    e0 = spa.topocentric_elevation_angle_without_atmosphere(latitudes, delta_prime, H_prime)
+    delta_e = spa.atmospheric_refraction_correction(pressure, temperature, e0, atmos_refract)
+    e = spa.topocentric_elevation_angle(e0, delta_e)
+    gamma = spa.topocentric_astronomers_azimuth(H_prime, delta_prime, latitudes)
+
+    return {'apparent_zenith': spa.topocentric_zenith_angle(e),
+            'zenith': spa.topocentric_zenith_angle(e0),
+            'apparent_elevation': e,
+            'elevation': e0,
+            'azimuth': spa.topocentric_azimuth_angle(gamma)}
+
+
+def site_solar_positions(configs, weather):
+    """Solar position frame of every site, one vectorized pass per distinct time index."""
+
+    groups = {}
+    for name, data in weather.items():
+        groups.setdefault(hashlib.sha1(data.index.asi8.tobytes()).hexdigest(), []).append(name)
+
+    positions = {}
+    for names in groups.values():
+        times = weather[names[0]].index
+        grid = solar_position_grid(times,
+                                   [configs[name].latitude for name in names],
+                                   [configs[name].longitude for name in names],
+                                   [get_location(configs[name]).altitude or 0 for name in names])
+        for i, name in enumerate(names):
+            positions[name] = pd.DataFrame({key: values[i] for key, values in grid.items()},
+                                           index = times)
+    return positions
+
+
+def _run_site(name, config, data, solar_position):
+    result = run_simulation(config, data, solar_position=solar_position)
+    row = {'name': name, 'latitude': config.latitude, 'longitude': config.longitude}
+    for key in total_fields:
+        row[key] = float(result.total_results[key].iloc[0])
+    return row
+
+
+def run_portfolio(base, sites, processes=None, rank_by='Energy', progress=None):
+    """Run the `base` design at every site of a frame with name, latitude, longitude.
+
+    Returns one row per site ranked by `rank_by`, best first. Sites whose
+    weather or model failed are listed last with their error.
+    """
+
+    configs = {str(row['name']): replace(base, latitude=float(row['latitude']),
+                                         longitude=float(row['longitude']))
+               for _, row in sites.iterrows()}
+
+    # Weather, from the cache when the site was already loaded
+    weather = {}
+    rows = []
+    for name, config in configs.items():
+        try:
+            weather[name] = get_tmy(config.latitude, config.longitude)[0]
+        except Exception as error:
+            rows.append({'name': name, 'latitude': config.latitude,
+                         'longitude': config.longitude, 'error': repr(error)})
+
+    positions = site_solar_positions(configs, weather)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(_run_site, name, configs[name], weather[name], positions[name]): name
+                   for name in weather}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                row = future.result()
+            except Exception as error:
+                row = {'name': name, 'latitude': configs[name].latitude,
+                       'longitude': configs[name].longitude, 'error': repr(error)}
+            rows.append(row)
+            if progress is not None:
+                progress(row)
+
+    table = pd.DataFrame(rows, columns=['name', 'latitude', 'longitude'] + total_fields + ['error'])
+    table = table.sort_values(rank_by, ascending=False, na_position='last').reset_index(drop=True)
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table
+
+
+def read_sites(path):
+    sites = pd.read_csv(path)
+    if 'name' not in sites:
+        sites['name'] = [f'site_{i}' for i in range(len(sites))]
+    return sites
+
+
+def read_config(path):
+    if path is None:
+        return SimulationConfig()
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            values = yaml.safe_load(f)
+        else:
+            values = json.load(f)
+    return SimulationConfig.from_dict(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run one plant design over many sites.')
+    parser.add_argument('sites', help='CSV with latitude, longitude and optional name columns')
+    parser.add_argument('--config', help='JSON or YAML with the plant SimulationConfig fields')
+    parser.add_argument('--rank-by', default='Energy', choices=total_fields)
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('-o', '--output', default='portfolio.csv')
+    args = parser.parse_args(argv)
+
+    table = run_portfolio(read_config(args.config), read_sites(args.sites),
+                          args.processes, args.rank_by)
+    table.to_csv(args.output, index=False)
+    return 1 if table['error'].notna().any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Timing instrumentation of the Bifacial Tool model.
+
+Every run records, stage by stage, the wall time, the number of rows and
+whether the stage came from the cache. With tracemalloc tracing (started by
+BIFACIAL_TOOL_TRACE_MEMORY=1 or start_memory_tracing) each stage also gets
+the peak memory it allocated. The report is a plain dict, saved as JSON.
+
+Setting BIFACIAL_TOOL_PROFILE to a file name dumps a full profile of every
+run: cProfile statistics for .prof files (read with pstats or snakeviz), a
+pyinstrument HTML page for .html files when pyinstrument is installed.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def start_memory_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+if os.environ.get('BIFACIAL_TOOL_TRACE_MEMORY', '').lower() in ('1', 'true', 'yes'):
+    start_memory_tracing()
+
+
+class Profiler:
+    """Per-stage wall time, rows and peak traced memory of one run."""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the block as stage `name`; the yielded record can be edited."""
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+        record = {'stage': name, 'seconds': 0.0, 'rows': rows, 'cached': False,
+                  'peak_memory_mb': None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if tracing:
+                record['peak_memory_mb'] = (tracemalloc.get_traced_memory()[1] - current) / 2**20
+            self.stages.append(record)
+
+    def report(self):
+        """Stages and total time as a JSON-ready dict."""
+
+        return {'total_seconds': sum(record['seconds'] for record in self.stages),
+                'memory_traced': tracemalloc.is_tracing(),
+                'stages': list(self.stages)}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+def format_report(report):
+    """One line per stage, for the GUI and the console."""
+
+    lines = [f"Total: {report['total_seconds']:.2f} s"]
+    for record in report['stages']:
+        line = f"{record['stage']}: {record['seconds']:.3f} s"
+        if record['cached']:
+            line += ' (cached)'
+        if record['rows'] is not None:
+            line += f", {record['rows']} rows"
+        if record['peak_memory_mb'] is not None:
+            line += f", {record['peak_memory_mb']:.1f} MB"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+@contextmanager
+def profiled(path=None):
+    """Full profile of the block dumped to `path`, or $BIFACIAL_TOOL_PROFILE.
+
+    Does nothing when neither is set.
+    """
+
+    path = path or os.environ.get('BIFACIAL_TOOL_PROFILE')
+    if not path:
+        yield
+        return
+
+    if path.endswith('.html'):
+        from pyinstrument import Profiler as Instrument
+        profiler = Instrument()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar store of hourly simulation results.
+
+Every run saved here keeps its hourly AC power (bifacial and monofacial), DC
+operating point and front/rear irradiance as a zstd-compressed Parquet file,
+float32, in one dataset partitioned by the hash of its config and weather:
+
+    root/hourly/run_hash=<hash>/part-0.parquet
+    root/scenarios/<hash>.json      config, weather, name and annual totals
+
+The same plant over two weather files (a PVGIS TMY and a measured year, or
+two scenario files at one site) are two runs. Saving the same config and
+weather again replaces its partition, so many scenarios can be appended from
+the GUI, the batch CLI or a script and later compared with filtered reads
+that only open the partitions and columns asked for.
+
+The default root is $BIFACIAL_TOOL_RESULTS or ~/bifacial_tool_results.
+Needs pyarrow.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import pandas as pd
+
+# Hourly columns, name: (frame, column). float32 keeps 7 significant digits,
+# well below the accuracy of the model
+hourly_sources = {'ac': ('results', 'bifacial'),
+                  'ac_non_bifacial': ('results', 'non bifacial'),
+                  'p_mp': ('results_dc', 'p_mp'),
+                  'v_mp': ('results_dc', 'v_mp'),
+                  'i_mp': ('results_dc', 'i_mp'),
+                  'front_irradiance': ('irrad', 'total_abs_front'),
+                  'rear_irradiance': ('irrad', 'total_abs_back'),
+                  'effective_irradiance': ('results', 'effective irradiance')}
+
+
+def default_root():
+    return os.environ.get('BIFACIAL_TOOL_RESULTS',
+                          os.path.join(os.path.expanduser('~'), 'bifacial_tool_results'))
+
+
+def config_hash(config):
+    """Short stable hash of every field of a SimulationConfig."""
+    return hashlib.sha1(json.dumps(config.to_dict(), sort_keys=True).encode()).hexdigest()[:16]
+
+
+def run_hash(result):
+    """Short stable hash of a run's config and weather fingerprint."""
+
+    if result.weather is None:
+        raise ValueError('The result has no weather fingerprint, run it with run_simulation or a Pipeline')
+    key = {'config': result.config.to_dict(), 'weather': result.weather}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def hourly_frame(result):
+    """float32 hourly frame of a SimulationResult, with a UTC time column."""
+
+    frames = {'results': result.results, 'results_dc': result.results_dc, 'irrad': result.irrad}
+    index = result.results.index
+    times = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+    hourly = pd.DataFrame({'time': times})
+    for name, (frame, column) in hourly_sources.items():
+        hourly[name] = frames[frame][column].to_numpy(dtype='float32')
+    return hourly
+
+
+def save_result(result, root=None, name=None):
+    """Add a run to the dataset at `root`, replacing a run of the same config and weather.
+
+    Returns its run hash.
+    """
+
+    root = root or default_root()
+    key = run_hash(result)
+
+    partition = os.path.join(root, 'hourly', f'run_hash={key}')
+    # Hidden while written, readers skip names starting with a dot
+    tmp = os.path.join(root, 'hourly', f'.run_hash={key}.tmp-{os.getpid()}-{threading.get_ident()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    hourly_frame(result).to_parquet(os.path.join(tmp, 'part-0.parquet'), index=False,
+                                    compression='zstd')
+    shutil.rmtree(partition, ignore_errors=True)
+    try:
+        os.replace(tmp, partition)
+    except OSError:
+        # Another worker saved the same config and weather meanwhile, same hours
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # Scenario record last, a run is listed only once its hours are there
+    scenario = {'run_hash': key, 'config_hash': config_hash(result.config),
+                'weather': result.weather, 'name': name,
+                'config': result.config.to_dict(),
+                'totals': {k: float(v) for k, v in result.aggregates.annual.items()}}
+    os.makedirs(os.path.join(root, 'scenarios'), exist_ok=True)
+    path = os.path.join(root, 'scenarios', f'{key}.json')
+    tmp = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp, 'w') as f:
+        json.dump(scenario, f, indent=2)
+    os.replace(tmp, path)
+    return key
+
+
+def list_scenarios(root=None, **filters):
+    """Table of the stored runs, one row per run hash.
+
+    Columns are the name, the config hash, the weather fingerprint, the
+    config fields and the annual totals. Keyword
+    arguments keep the runs whose config field equals the value, or is in
+    it when a list is given, e.g. list_scenarios(tracking='Backtrack').
+    Monthly albedos are tuples, as in SimulationConfig, and a tuple is
+    matched as one value: list_scenarios(albedo=config.albedo).
+    """
+
+    root = root or default_root()
+    rows = []
+    for path in sorted(glob.glob(os.path.join(root, 'scenarios', '*.json'))):
+        with open(path) as f:
+            scenario = json.load(f)
+        # JSON gives monthly values back as lists, which cannot be compared
+        config = {key: tuple(value) if isinstance(value, list) else value
+                  for key, value in scenario['config'].items()}
+        rows.append({'run_hash': scenario['run_hash'], 'name': scenario['name'],
+                     'config_hash': scenario['config_hash'], 'weather': scenario['weather'],
+                     **config, **scenario['totals']})
+    table = pd.DataFrame(rows)
+    for key, value in filters.items():
+        if table.empty:
+            break
+        values = list(value) if isinstance(value, (list, set)) else [value]
+        table = table[table[key].isin(values)]
+    return table.set_index('run_hash') if not table.empty else table
+
+
+def _utc(time):
+    time = pd.Timestamp(time)
+    return time.tz_localize('UTC') if time.tz is None else time.tz_convert('UTC')
+
+
+def read_hourly(root=None, run_hashes=None, columns=None, start=None, end=None):
+    """Hourly rows of the stored runs, with a run_hash column.
+
+    Only the partitions of `run_hashes` (all by default) and the given
+    `columns` are read; `start` and `end` bound the time column.
+    """
+
+    root = root or default_root()
+    filters = []
+    if run_hashes is not None:
+        filters.append(('run_hash', 'in', list(run_hashes)))
+    if start is not None:
+        filters.append(('time', '>=', _utc(start)))
+    if end is not None:
+        filters.append(('time', '<', _utc(end)))
+    if columns is not None:
+        columns = ['run_hash', 'time'] + [c for c in columns if c not in ('run_hash', 'time')]
+
+    return pd.read_parquet(os.path.join(root, 'hourly'), columns=columns,
+                           filters=filters or None)
+
+
+def compare(root=None, column='ac', freq='MS', **filters):
+    """`column` of every run matching `filters`, summed per period, one column per run."""
+
+    scenarios = list_scenarios(root, **filters)
+    if scenarios.empty:
+        return pd.DataFrame()
+    hourly = read_hourly(root, scenarios.index, [column])
+    # run_hash is categorical over every partition, keep only the runs read
+    table = hourly.pivot_table(index=pd.Grouper(key='time', freq=freq), columns='run_hash',
+                               values=column, aggfunc='sum', observed=True)
+    names = scenarios['name'].fillna(pd.Series(scenarios.index, index=scenarios.index))
+    return table.rename(columns=names.to_dict())
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+String and inverter sizing checks.
+
+The PVsyst voltage window conditions and the DC/AC ratio classes used by the
+GUI, written once for single values and evaluated over the whole catalogue:
+every bifacial module against every CEC inverter over a range of modules per
+string and strings, in broadcast NumPy arrays.
+
+    python -m bifacial_tool.sizing --modules-per-string 6 30 --strings 1 20 -o feasible.csv
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from .databases import get_modules, get_inverters
+
+# Cell temperatures of the voltage checks: hot operating, nominal, cold open circuit
+check_temperatures = [60, 20, -10]
+
+voltage_messages = {
+    1: 'Voltage warning! Minimum array operating value ({min_op:.2f}V)\n less than minimum inverter operating value ({vmppt_min:.2f}V)',
+    2: 'Voltage warning! Maximum array operating value ({max_op:.2f}V)\n greater than maximum inverter operating value ({vmppt_max:.2f}V)',
+    3: 'Voltage warning! Maximum array absolute value ({max_abs:.2f}V)\n less than absolute inverter value ({vdco:.2f}V)',
+    4: 'Voltage warning! Maximum array operating value ({max_abs:.2f}V)\n greater than maximum system specification value ({v_system:.2f}V)',
+}
+voltage_ok_message = 'Voltage between safety parameters.'
+
+sizing_classes = ['strongly oversized', 'slightly oversized', 'ok',
+                  'slightly undersized', 'strongly undersized']
+sizing_messages = {'strongly oversized': 'Warning! Inverter strongly oversized.',
+                   'slightly oversized': 'Inverter slightly oversized. ',
+                   'ok': 'Inverter sizing between safety parameters.',
+                   'slightly undersized': 'Inverter slightly undersized.',
+                   'strongly undersized': 'Warning! Inverter strongly undersized.'}
+
+_voltages = {}
+
+
+def module_voltages(modules=None):
+    """v_mp at 60 C and 20 C and v_oc at -10 C of every module, at 1000 W/m2.
+
+    Solved in one single diode call for all modules and temperatures, and
+    kept after the first call for the whole catalogue.
+    """
+
+    if modules is None:
+        if 'catalogue' not in _voltages:
+            _voltages['catalogue'] = module_voltages(get_modules())
+        return _voltages['catalogue']
+
+    from pvlib import pvsystem
+
+    params = {key: modules.loc[key].to_numpy(dtype='float64')
+              for key in ('alpha_sc', 'a_ref', 'I_L_ref', 'I_o_ref', 'R_sh_ref', 'R_s', 'STC', 'V_mp_ref')}
+    temps = np.reshape(check_temperatures, (-1, 1)) * np.ones((1, modules.shape[1]))
+
+    # Do calculations for max and min temperature
+    IL, I0, Rs, Rsh, nNsVth = pvsystem.calcparams_cec(effective_irradiance = 1000,
+                                                      temp_cell = temps,
+                                                      alpha_sc = params['alpha_sc'],
+                                                      a_ref = params['a_ref'],
+                                                      I_L_ref = params['I_L_ref'],
+                                                      I_o_ref = params['I_o_ref'],
+                                                      R_sh_ref = params['R_sh_ref'],
+                                                      R_s = params['R_s'],
+                                                      Adjust = 0)
+    shape = temps.shape
+    IL, I0, Rs, Rsh, nNsVth = (np.broadcast_to(value, shape).ravel() for value in (IL, I0, Rs, Rsh, nNsVth))
+    curve_info = pvsystem.singlediode(IL, I0, Rs, Rsh, nNsVth, method='lambertw')
+    v_mp = np.asarray(curve_info['v_mp']).reshape(shape)
+    v_oc = np.asarray(curve_info['v_oc']).reshape(shape)
+
+    return pd.DataFrame({'v_mp_hot': v_mp[0],
+                         'v_mp_nominal': v_mp[1],
+                         'v_oc_cold': v_oc[2],
+                         'V_mp_ref': params['V_mp_ref'],
+                         'STC': params['STC']},
+                        index = modules.columns)
+
+
+def voltage_codes(min_op, max_op, max_abs, vmppt_min, vmppt_max, v_system):
+    """First failing PVsyst condition (1 to 4) of broadcast arrays, 0 when none fails."""
+
+    codes = np.zeros(np.broadcast(min_op, max_op, max_abs, vmppt_min, vmppt_max, v_system).shape, dtype='int8')
+    # Later conditions first, so the first failing one wins
+    codes[np.broadcast_to(max_abs < v_system, codes.shape)] = 4
+    codes[np.broadcast_to(max_abs < vmppt_min, codes.shape)] = 3
+    codes[np.broadcast_to(max_op > vmppt_max, codes.shape)] = 2
+    codes[np.broadcast_to(min_op < vmppt_min, codes.shape)] = 1
+    return codes
+
+
+def sizing_class(ratio):
+    """DC/AC ratio class index into sizing_classes, for scalars or arrays."""
+
+    ratio = np.asarray(ratio, dtype='float64')
+    classes = np.full(ratio.shape, 2, dtype='int8')
+    classes[ratio > 1.5] = 4
+    classes[(ratio >= 1.3) & (ratio <= 1.5)] = 3
+    classes[ratio < 1] = 0
+    classes[(ratio >= 1) & (ratio <= 1.15)] = 1
+    return classes
+
+
+def voltage_check(module_name, inverter_name, modules_per_string):
+    """GUI message of the voltage conditions for one combination."""
+
+    voltages = module_voltages().loc[module_name]
+    inverter = get_inverters()[inverter_name]
+    values = {'min_op': voltages['v_mp_hot'] * modules_per_string,
+              'max_op': voltages['v_mp_nominal'] * modules_per_string,
+              'max_abs': voltages['v_oc_cold'] * modules_per_string,
+              'vmppt_min': inverter['Mppt_low'],
+              'vmppt_max': inverter['Mppt_high'],
+              'vdco': inverter['Vdco'],
+              'v_system': voltages['V_mp_ref']}
+    code = int(voltage_codes(values['min_op'], values['max_op'], values['max_abs'],
+                             values['vmppt_min'], values['vmppt_max'], values['v_system']))
+    if code == 0:
+        return voltage_ok_message
+    return voltage_messages[code].format(**values)
+
+
+def sizing_check(module_name, inverter_name, modules_per_string, strings):
+    """GUI message of the DC/AC ratio for one combination."""
+
+    pv_power = module_voltages().loc[module_name, 'STC'] * modules_per_string * strings
+    ratio = pv_power / get_inverters()[inverter_name]['Pdco']
+    return sizing_messages[sizing_classes[int(sizing_class(ratio))]]
+
+
+def feasible_combinations(modules_per_string, strings, modules=None, inverters=None,
+                          allowed=('slightly oversized', 'ok', 'slightly undersized'),
+                          chunk_size=64):
+    """Every module x inverter x modules per string x strings passing the checks.
+
+    `modules_per_string` and `strings` are sequences of counts, `modules` and
+    `inverters` optional name lists (whole catalogue by default). Keeps the
+    combinations without voltage warning whose DC/AC ratio class is in
+    `allowed`. Returns a table indexed by (module, inverter,
+    modules_per_string, strings).
+    """
+
+    voltages = module_voltages()
+    if modules is not None:
+        voltages = voltages.loc[list(modules)]
+    voltages = voltages.dropna()
+    inverter_db = get_inverters()
+    if inverters is not None:
+        inverter_db = inverter_db[list(inverters)]
+
+    inverter_params = {key: inverter_db.loc[key].to_numpy(dtype='float64')
+                       for key in ('Mppt_low', 'Mppt_high', 'Pdco')}
+    usable = np.isfinite(np.column_stack(list(inverter_params.values()))).all(axis=1)
+    inverter_names = inverter_db.columns[usable]
+    vmppt_min, vmppt_max, pdco = (inverter_params[key][usable] for key in ('Mppt_low', 'Mppt_high', 'Pdco'))
+
+    mps = np.asarray(modules_per_string, dtype='float64')
+    n_strings = np.asarray(strings, dtype='float64')
+    allowed_classes = [sizing_classes.index(name) for name in allowed]
+
+    tables = []
+    # Modules in chunks to bound the (modules, inverters, modules per string) arrays
+    for start in range(0, len(voltages), chunk_size):
+        chunk = voltages.iloc[start:start + chunk_size]
+        v = {key: chunk[key].to_numpy(dtype='float64')[:, None, None] for key in chunk.columns}
+
+        min_op = v['v_mp_hot'] * mps
+        max_op = v['v_mp_nominal'] * mps
+        max_abs = v['v_oc_cold'] * mps
+        codes = voltage_codes(min_op, max_op, max_abs,
+                              vmppt_min[None, :, None], vmppt_max[None, :, None], v['V_mp_ref'])
+        m, i, s = np.nonzero(codes == 0)
+        if len(m) == 0:
+            continue
+
+        # DC/AC ratio of the voltage-feasible triples for every string count
+        ratio = (v['STC'][m, 0, 0] * mps[s] / pdco[i])[:, None] * n_strings
+        keep = np.isin(sizing_class(ratio), allowed_classes)
+        k, p = np.nonzero(keep)
+
+        tables.append(pd.DataFrame({
+            'module': chunk.index.to_numpy()[m[k]],
+            'inverter': inverter_names.to_numpy()[i[k]],
+            'modules_per_string': mps[s[k]].astype(int),
+            'strings': n_strings[p].astype(int),
+            'dc_ac_ratio': ratio[k, p],
+            'sizing': pd.Categorical.from_codes(sizing_class(ratio[k, p]), sizing_classes),
+            'min_operating_voltage': min_op[m[k], 0, s[k]],
+            'max_operating_voltage': max_op[m[k], 0, s[k]],
+            'max_absolute_voltage': max_abs[m[k], 0, s[k]]}))
+
+    columns = ['module', 'inverter', 'modules_per_string', 'strings']
+    if not tables:
+        return pd.DataFrame(columns=columns + ['dc_ac_ratio', 'sizing']).set_index(columns)
+    return pd.concat(tables, ignore_index=True).set_index(columns).sort_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Feasible module/inverter/string combinations.')
+    parser.add_argument('--modules-per-string', type=int, nargs=2, default=[4, 30],
+                        metavar=('MIN', 'MAX'))
+    parser.add_argument('--strings', type=int, nargs=2, default=[1, 20], metavar=('MIN', 'MAX'))
+    parser.add_argument('--module', action='append', help='restrict to these modules')
+    parser.add_argument('--inverter', action='append', help='restrict to these inverters')
+    parser.add_argument('-o', '--output', default='feasible.csv')
+    args = parser.parse_args(argv)
+
+    table = feasible_combinations(range(args.modules_per_string[0], args.modules_per_string[1] + 1),
+                                  range(args.strings[0], args.strings[1] + 1),
+                                  args.module, args.inverter)
+    table.to_csv(args.output)
+    print(f'{len(table)} feasible combinations', file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
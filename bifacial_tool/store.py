@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk columnar store for time series frames.
+
+Each entry is a directory holding the float values as one 2-D .npy array, the
+timestamps as datetime64 and a small meta.json. Values are memory-mapped on
+load, so reopening an entry does not copy or parse anything. Entries are
+evicted least recently used first once a cache directory grows past its size
+limit.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import datetime
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+store_version = 1
+
+# Suffixes of entries being written or replaced
+partial_suffixes = ('.tmp-', '.old-')
+
+
+def cache_root(*parts):
+    """Cache directory, $BIFACIAL_TOOL_CACHE or ~/.cache/bifacial_tool."""
+
+    root = os.environ.get('BIFACIAL_TOOL_CACHE',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'bifacial_tool'))
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def exists(path):
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def _tz_name(tz):
+    """Zone name of a timezone, or its offset in seconds for fixed offset zones."""
+
+    name = getattr(tz, 'zone', None) or getattr(tz, 'key', None)
+    if name is not None or str(tz) == 'UTC':
+        return name or 'UTC'
+    # EPW and TMY3 files only give a fixed UTC offset
+    return int(tz.utcoffset(None).total_seconds())
+
+
+def _tz(name):
+    if isinstance(name, int):
+        return datetime.timezone(datetime.timedelta(seconds=name))
+    return name
+
+
+def save_frame(path, df, meta=None):
+    """Write a frame with a DatetimeIndex and numeric columns to `path`."""
+
+    writer = f'{os.getpid()}-{threading.get_ident()}'
+    tmp = f'{path}.tmp-{writer}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    index = df.index
+    tz = _tz_name(index.tz) if index.tz is not None else None
+    if tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+
+    np.save(os.path.join(tmp, 'values.npy'), df.to_numpy(dtype='float64'))
+    np.save(os.path.join(tmp, 'index.npy'), index.to_numpy(dtype='datetime64[ns]'))
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'version': store_version,
+                   'columns': [str(c) for c in df.columns],
+                   'tz': tz,
+                   'meta': meta}, f)
+
+    # Move the old entry aside whole, then swap the finished one in: `path`
+    # is always a complete entry or missing, never half deleted
+    old = f'{path}.old-{writer}'
+    shutil.rmtree(old, ignore_errors=True)
+    try:
+        os.replace(path, old)
+    except FileNotFoundError:
+        pass
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another process wrote the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not exists(path):
+            raise
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_frame(path, mmap=True):
+    """Read an entry back as (frame, meta). Values are read-only when mmap is True.
+
+    Raises OSError when the entry is replaced or evicted while it is read,
+    and KeyError when another store version wrote it; callers treat both as
+    a cache miss.
+    """
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        info = json.load(f)
+    if info.get('version') != store_version:
+        raise KeyError(f'{path} was written by another store version')
+
+    values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r' if mmap else None)
+    index = pd.DatetimeIndex(np.load(os.path.join(path, 'index.npy')))
+    if info['tz'] is not None:
+        index = index.tz_localize('UTC').tz_convert(_tz(info['tz']))
+
+    # Mark as recently used for the LRU eviction
+    os.utime(os.path.join(path, 'meta.json'))
+
+    return pd.DataFrame(values, index=index, columns=info['columns'], copy=False), info['meta']
+
+
+def entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def evict(root, max_bytes):
+    """Delete least recently used entries under `root` until it fits in max_bytes."""
+
+    entries = []
+    for entry in os.scandir(root):
+        if entry.is_dir() and exists(entry.path) and not any(suffix in entry.name
+                                                             for suffix in partial_suffixes):
+            last_used = os.path.getmtime(os.path.join(entry.path, 'meta.json'))
+            entries.append((last_used, entry_size(entry.path), entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel parameter sweeps of the Bifacial Tool model.
+
+Every point of a grid (gcr, row height, row width, albedo, bifaciality,
+tracking...) is run by the headless engine in a process pool. The TMY data and
+the solar position are sent once to each worker, not once per point, and each
+point's totals are streamed back as soon as its task finishes.
+
+Points that only differ in electrical parameters (module, inverter, strings,
+bifaciality) need the same irradiance solve. The first point of each group
+runs alone and leaves its solve in the shared on-disk irradiance cache; once
+it finishes, the rest of the group fans out over every worker, which only
+loads the solve and runs the electrical stage.
+
+Example:
+    python -m bifacial_tool.sweep --latitude 40.45 --longitude -3.73 --gcr 0.3 0.4 0.5
+                                  --albedo 0.2 0.3 --tracking Track Backtrack -o sweep.csv
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import replace, fields
+import pandas as pd
+from .engine import SimulationConfig, get_solar_position, track_options
+from .pipeline import Pipeline
+
+# Totals streamed for every point
+total_fields = ['Energy', 'Yield', 'Bifacial gains', 'PR']
+
+# Fields only the electrical stage reads
+electrical_fields = ('module', 'inverter', 'modules_per_string', 'strings', 'bifaciality')
+
+# Per-process state, set once by init_worker
+_worker = {}
+
+
+def make_grid(base, grid):
+    """Expand {parameter: values} into one SimulationConfig per grid point."""
+
+    names = {f.name for f in fields(SimulationConfig)}
+    for key in grid:
+        if key not in names:
+            raise ValueError(f'Unknown sweep parameter {key!r}')
+        if key in ('latitude', 'longitude'):
+            raise ValueError('A sweep runs a single site, latitude and longitude cannot be swept')
+
+    keys = list(grid)
+
+    # The last parameter varies fastest, so the electrical ones go last and
+    # the points of an irradiance group are consecutive
+    keys.sort(key=lambda key: key in electrical_fields)
+    return [replace(base, **dict(zip(keys, values)))
+            for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def irradiance_group(config):
+    """Key shared by the configs that need the same irradiance solve."""
+    return tuple(getattr(config, f.name) for f in fields(config) if f.name not in electrical_fields)
+
+
+def init_worker(data, solar_position):
+    """Process pool initializer: weather, solar position and a Pipeline per worker."""
+    _worker['data'] = data
+    _worker['solar_position'] = solar_position
+    _worker['pipeline'] = Pipeline()
+
+
+def run_point(point, config, keys):
+    """Totals row of one point, run in a worker set up by init_worker."""
+
+    # Consecutive points of a worker share their unchanged upstream stages
+    result = _worker['pipeline'].run(config, _worker['data'],
+                                     solar_position=_worker['solar_position'])
+
+    row = {'point': point}
+    for key in keys:
+        row[key] = getattr(config, key)
+    for key in total_fields:
+        row[key] = float(result.total_results[key].iloc[0])
+    return row
+
+
+def iter_sweep(base, grid, data, processes=None):
+    """Run the grid in a process pool, yielding each point's row as it finishes."""
+
+    configs = make_grid(base, grid)
+    keys = list(grid)
+
+    # Same site for every point, so the solar position is computed only once
+    solar_position = get_solar_position(base, data.index)
+
+    groups = {}
+    for point, config in enumerate(configs):
+        groups.setdefault(irradiance_group(config), []).append((point, config))
+
+    with ProcessPoolExecutor(max_workers=processes,
+                             initializer=init_worker,
+                             initargs=(data, solar_position)) as pool:
+        # One solve per group first, its other points once it is cached
+        pending = {pool.submit(run_point, *points[0], keys): points[1:]
+                   for points in groups.values()}
+        while pending:
+            done = wait(pending, return_when=FIRST_COMPLETED)[0]
+            for future in done:
+                row = future.result()
+                for point, config in pending.pop(future):
+                    pending[pool.submit(run_point, point, config, keys)] = []
+                yield row
+
+
+def run_sweep(base, grid, data, processes=None, callback=None):
+    """Run the grid and return a results table ordered by grid point."""
+
+    rows = []
+    for row in iter_sweep(base, grid, data, processes):
+        if callback is not None:
+            callback(row)
+        rows.append(row)
+
+    return pd.DataFrame(rows).set_index('point').sort_index()
+
+
+def main(argv=None):
+    from .weather import get_tmy
+
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep of the bifacial model.')
+    parser.add_argument('--latitude', type=float, default=SimulationConfig.latitude)
+    parser.add_argument('--longitude', type=float, default=SimulationConfig.longitude)
+    parser.add_argument('--gcr', type=float, nargs='+')
+    parser.add_argument('--row-height', type=float, nargs='+')
+    parser.add_argument('--row-width', type=float, nargs='+')
+    parser.add_argument('--albedo', type=float, nargs='+')
+    parser.add_argument('--bifaciality', type=float, nargs='+')
+    parser.add_argument('--tracking', nargs='+', choices=track_options)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('-o', '--output', default='sweep.csv')
+    args = parser.parse_args(argv)
+
+    grid = {key: values for key, values in (('gcr', args.gcr),
+                                            ('row_height', args.row_height),
+                                            ('row_width', args.row_width),
+                                            ('albedo', args.albedo),
+                                            ('bifaciality', args.bifaciality),
+                                            ('tracking', args.tracking))
+            if values}
+    if not grid:
+        parser.error('nothing to sweep, give at least one parameter')
+
+    base = SimulationConfig(latitude=args.latitude, longitude=args.longitude)
+    data = get_tmy(args.latitude, args.longitude)[0]
+
+    # Stream every point to the results table as soon as it finishes
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['point'] + list(grid) + total_fields)
+        writer.writeheader()
+        for row in iter_sweep(base, grid, data, args.processes):
+            writer.writerow(row)
+            f.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Single-axis tracker orientation tables.
+
+The true-tracking rotation of a tracker only depends on the sun and the axis
+(tilt, azimuth), not on the row spacing. It is computed once per site, time
+grid and axis and kept; backtracking, the rotation limit and the surface
+angles are then evaluated for many GCR values in one broadcast
+(gcr x times) pass. Results match pvlib's SingleAxisTrackerMount with no
+cross-axis slope.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Ideal rotations kept, one per site, time grid and axis
+table_entries = 16
+_ideal = OrderedDict()
+
+
+def _sun_key(solar_position, axis_tilt, axis_azimuth):
+    h = hashlib.sha1()
+    h.update(solar_position.index.asi8.tobytes())
+    for column in ('apparent_zenith', 'azimuth'):
+        h.update(np.ascontiguousarray(solar_position[column], dtype='float64').tobytes())
+    h.update(repr((float(axis_tilt), float(axis_azimuth))).encode())
+    return h.hexdigest()
+
+
+def ideal_rotation(solar_position, axis_tilt=0, axis_azimuth=180):
+    """True-tracking rotation in degrees, NaN with the sun below the horizon."""
+
+    from pvlib import tracking
+
+    key = _sun_key(solar_position, axis_tilt, axis_azimuth)
+    if key in _ideal:
+        _ideal.move_to_end(key)
+        return _ideal[key]
+
+    # No rotation limit and no backtracking leaves the ideal angle
+    ideal = tracking.singleaxis(solar_position['apparent_zenith'], solar_position['azimuth'],
+                                axis_tilt = axis_tilt,
+                                axis_azimuth = axis_azimuth,
+                                max_angle = 180,
+                                backtrack = False)['tracker_theta']
+    ideal = np.asarray(ideal, dtype='float64')
+    ideal.setflags(write=False)
+
+    _ideal[key] = ideal
+    if len(_ideal) > table_entries:
+        _ideal.popitem(last=False)
+    return ideal
+
+
+def clear():
+    _ideal.clear()
+
+
+def orientation_table(solar_position, gcrs, axis_tilt=0, axis_azimuth=180, max_angle=60,
+                      backtrack=True):
+    """Tracker angles for every gcr at once.
+
+    Returns a dict of (len(gcrs), times) arrays: tracker_theta, aoi,
+    surface_tilt and surface_azimuth.
+    """
+
+    from pvlib import irradiance, tracking
+
+    omega = ideal_rotation(solar_position, axis_tilt, axis_azimuth)[None, :]
+    gcrs = np.asarray(gcrs, dtype='float64').reshape(-1, 1)
+
+    if backtrack:
+        # Rotation back from the ideal angle that avoids row to row shading
+        temp = np.abs(np.cos(np.radians(omega)) / gcrs)
+        with np.errstate(invalid='ignore'):
+            correction = np.where(temp < 1, np.degrees(-np.sign(omega) * np.arccos(temp)), 0)
+        theta = omega + correction
+    else:
+        theta = np.broadcast_to(omega, (len(gcrs), omega.shape[1]))
+    theta = np.clip(theta, -max_angle, max_angle)
+
+    surface = tracking.calc_surface_orientation(theta, axis_tilt, axis_azimuth)
+    aoi = irradiance.aoi(surface['surface_tilt'], surface['surface_azimuth'],
+                         np.asarray(solar_position['apparent_zenith'])[None, :],
+                         np.asarray(solar_position['azimuth'])[None, :])
+    return {'tracker_theta': theta,
+            'aoi': np.asarray(aoi),
+            'surface_tilt': np.asarray(surface['surface_tilt']),
+            'surface_azimuth': np.asarray(surface['surface_azimuth'])}
+
+
+def tracker_orientation(solar_position, gcr, axis_tilt=0, axis_azimuth=180, max_angle=60,
+                        backtrack=True):
+    """Orientation frame of one tracker, as SingleAxisTrackerMount.get_orientation."""
+
+    table = orientation_table(solar_position, [gcr], axis_tilt, axis_azimuth, max_angle, backtrack)
+    return pd.DataFrame({key: values[0] for key, values in table.items()},
+                        index = solar_position.index)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo energy yield uncertainty of the Bifacial Tool model.
+
+Samples albedo, bifaciality, front soiling, module power tolerance and the
+interannual variability of the irradiance, and returns the annual energy of
+every sample with its P50, P75, P90 and P99 exceedance values.
+
+Only two irradiance solves are made, the cached albedo basis, from which the
+front and rear irradiance of any albedo is a linear combination. The
+electrical model then runs on (samples x daylight hours) blocks in batches.
+All night hours give the same inverter consumption, so they are solved once
+and weighted by their count. Hours without irradiance (trackers at night,
+NaN) count no energy, as in run_simulation, so the P50 is on the same basis
+as the deterministic run.
+
+    python -m bifacial_tool.uncertainty --latitude 40.45 --longitude -3.73 --tracking Backtrack
+                                        --gcr 0.4 --samples 2000 -o samples.csv
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from . import electrical
+from .aggregates import interval_hours
+from .databases import get_module, get_inverter
+from .engine import (SimulationConfig, get_solar_position, get_orientation, get_albedo,
+                    get_albedo_basis, installed_power, temp_model_parameters, track_options)
+
+# Default uncertainties, name: (distribution, parameters). Albedo and
+# bifaciality spread around the config value in absolute terms, soiling is
+# the front irradiance loss, module tolerance the power over nameplate and
+# weather the relative interannual change of the irradiance
+default_uncertainties = {'albedo': ('normal', 0.03),
+                         'bifaciality': ('normal', 0.03),
+                         'soiling': ('uniform', (0.0, 0.04)),
+                         'module_tolerance': ('uniform', (0.0, 0.03)),
+                         'weather': ('normal', 0.045)}
+
+exceedance_levels = (50, 75, 90, 99)
+
+
+def sample_inputs(config, samples, uncertainties=None, seed=None, albedo=None):
+    """Frame of `samples` draws of every uncertain input.
+
+    The albedo is drawn around `albedo`, by default the config's, which is
+    the mean value for a varying albedo.
+    """
+
+    uncertainties = dict(default_uncertainties, **(uncertainties or {}))
+    rng = np.random.default_rng(seed)
+
+    def draw(name, center):
+        distribution, params = uncertainties[name]
+        if distribution == 'normal':
+            return rng.normal(center, params, samples)
+        if distribution == 'uniform':
+            return center + rng.uniform(params[0], params[1], samples)
+        if distribution == 'fixed':
+            return np.full(samples, center + params)
+        raise ValueError(f'Unknown distribution {distribution!r} for {name}')
+
+    albedo = config.albedo if albedo is None else albedo
+    return pd.DataFrame({'albedo': np.clip(draw('albedo', albedo), 0, 1),
+                         'bifaciality': np.clip(draw('bifaciality', config.bifaciality), 0, 1),
+                         'soiling': np.clip(draw('soiling', 0.0), 0, 1),
+                         'module_tolerance': draw('module_tolerance', 0.0),
+                         'weather': np.clip(draw('weather', 1.0), 0, None)})
+
+
+def exceedance(values, levels=exceedance_levels):
+    """P-values of a sample: P90 is exceeded by 90 % of the samples."""
+    return {f'P{level}': float(np.percentile(values, 100 - level)) for level in levels}
+
+
+def run_monte_carlo(config, data, samples=1000, uncertainties=None, seed=None,
+                    batch_size=128, solar_position=None):
+    """Annual energy of every sample and its exceedance values.
+
+    Returns (table, summary): one row per sample with its inputs, Energy
+    [MWh] and Yield [kWh/kWp], and a dict of P-values of the energy.
+    """
+
+    # A varying albedo keeps its profile, shifted by each sample's change of the mean
+    albedo = np.broadcast_to(np.asarray(get_albedo(config, data), dtype='float64'), len(data))
+    mean_albedo = float(albedo.mean())
+    inputs = sample_inputs(config, samples, uncertainties, seed, mean_albedo)
+
+    if solar_position is None:
+        solar_position = get_solar_position(config, data.index)
+    orientation = get_orientation(config, solar_position)
+    base, slope = get_albedo_basis(config, solar_position, orientation, data)
+
+    front = np.stack([base['total_abs_front'].to_numpy(), slope['total_abs_front'].to_numpy()])
+    back = np.stack([base['total_abs_back'].to_numpy(), slope['total_abs_back'].to_numpy()])
+
+    # Hours without irradiance give NaN power, which the engine's sums skip
+    valid = ~(np.isnan(front).any(axis=0) | np.isnan(back).any(axis=0))
+
+    # Daylight hours, plus one night hour standing for all of them
+    day = valid & ((np.abs(front).sum(axis=0) + np.abs(back).sum(axis=0)) > 0)
+    columns = np.flatnonzero(day)
+    weights = np.ones(len(columns))
+    night = np.flatnonzero(valid & ~day)
+    if len(night):
+        columns = np.append(columns, night[0])
+        weights = np.append(weights, len(night))
+    front, back, albedo = front[:, columns], back[:, columns], albedo[columns]
+
+    module = get_module(config.module)
+    inverter = get_inverter(config.inverter)
+    step = interval_hours(data.index)
+    dc_power = installed_power(config)
+
+    energy = np.empty(samples)
+    for start in range(0, samples, batch_size):
+        batch = inputs.iloc[start:start + batch_size]
+        shift = batch['albedo'].to_numpy()[:, None] - mean_albedo
+        sample_albedo = np.clip(albedo + shift, 0, 1)
+        sample_front = (front[0] + sample_albedo * front[1]) * (1 - batch['soiling'].to_numpy()[:, None])
+        sample_back = back[0] + sample_albedo * back[1]
+        effective_irradiance = ((sample_front + batch['bifaciality'].to_numpy()[:, None] * sample_back)
+                                * batch['weather'].to_numpy()[:, None])
+        out = electrical.run_electrical(effective_irradiance, module, inverter,
+                                        temp_model_parameters,
+                                        config.modules_per_string, config.strings,
+                                        dc_scale = 1 + batch['module_tolerance'].to_numpy())
+        energy[start:start + len(batch)] = np.nansum(out['ac'] * weights, axis=1) * step
+
+    table = inputs.assign(Energy=energy / 1e6, Yield=energy / dc_power)
+    return table, exceedance(table['Energy'])
+
+
+def main(argv=None):
+    from .weather import get_tmy
+
+    parser = argparse.ArgumentParser(description='Monte Carlo P50/P90 energy of the bifacial model.')
+    parser.add_argument('--latitude', type=float, default=SimulationConfig.latitude)
+    parser.add_argument('--longitude', type=float, default=SimulationConfig.longitude)
+    parser.add_argument('--tracking', default=SimulationConfig.tracking, choices=track_options)
+    parser.add_argument('--gcr', type=float, default=SimulationConfig.gcr)
+    parser.add_argument('--albedo', default=str(SimulationConfig.albedo),
+                        help="a value, 12 monthly values separated by commas or 'weather'")
+    parser.add_argument('--bifaciality', type=float, default=SimulationConfig.bifaciality)
+    parser.add_argument('--irradiance-model', default=SimulationConfig.irradiance_model)
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('-o', '--output', help='write every sample to this CSV')
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(latitude=args.latitude, longitude=args.longitude,
+                              tracking=args.tracking, gcr=args.gcr, albedo=args.albedo,
+                              bifaciality=args.bifaciality, irradiance_model=args.irradiance_model)
+    data = get_tmy(args.latitude, args.longitude)[0]
+
+    table, summary = run_monte_carlo(config, data, args.samples, seed=args.seed)
+    if args.output:
+        table.to_csv(args.output, index_label='sample')
+    for key, value in summary.items():
+        print(f'{key}: {value:.2f} MWh')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
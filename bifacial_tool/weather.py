@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Weather data for the Bifacial Tool.
+
+PVGIS TMY downloads are kept in a local cache keyed by the site coordinates,
+rounded to 0.01 deg, and the PVGIS options. Set BIFACIAL_TOOL_OFFLINE=1 to
+serve only cached sites, and pre-warm the cache for a list of sites with:
+
+    python -m bifacial_tool.weather warm sites.csv
+
+Local files (EPW, TMY3, PVGIS CSV, and measured series as CSV or Parquet) are
+read with load_weather. Each file is parsed once, normalized to the ghi, dni,
+dhi, temp_air, wind_speed and albedo (when given) columns and stored in the columnar cache, so
+opening it again is a zero-copy memory map. More formats can be added with
+register_reader. Import a folder of files ahead of a batch run with:
+
+    python -m bifacial_tool.weather import archive/*.epw
+
+https://re.jrc.ec.europa.eu/pvg_tools/en/#TMY
+
+@author: Jesús
+"""
+
+# Libraries
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import pandas as pd
+from . import store
+
+# Cache size limit before least recently used sites are evicted
+tmy_cache_size = int(os.environ.get('BIFACIAL_TOOL_TMY_CACHE_MB', 500)) * 2**20
+local_cache_size = int(os.environ.get('BIFACIAL_TOOL_LOCAL_CACHE_MB', 2000)) * 2**20
+
+# Columns of every weather frame, the first three are required
+weather_columns = ['ghi', 'dni', 'dhi', 'temp_air', 'wind_speed', 'albedo']
+
+# Other names of those columns in measured data files
+column_aliases = {'GHI': 'ghi', 'DNI': 'dni', 'DHI': 'dhi',
+                  'G(h)': 'ghi', 'Gb(n)': 'dni', 'Gd(h)': 'dhi',
+                  'T2m': 'temp_air', 'air_temperature': 'temp_air', 'temperature': 'temp_air',
+                  'WS10m': 'wind_speed', 'wind': 'wind_speed',
+                  'Alb': 'albedo', 'surface_albedo': 'albedo'}
+
+
+class TMYNotCached(LookupError):
+    """Raised in offline mode for a site that is not in the cache."""
+
+
+def is_offline():
+    return os.environ.get('BIFACIAL_TOOL_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+
+def tmy_key(latitude, longitude, **options):
+    digest = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()[:10]
+    return f'{round(latitude, 2):+.2f}_{round(longitude, 2):+.2f}_{digest}'
+
+
+def to_single_year(data):
+    """Typical year data with every timestamp moved to its latest year."""
+
+    # get the latest year in the index
+    latest_year = max(data.index.year)
+
+    # create a new index with the latest year
+    new_index = data.index.map(lambda x: x.replace(year=latest_year))
+
+    # set the new index on the dataframe
+    return data.set_index(new_index).sort_index()
+
+
+def get_tmy(latitude, longitude, offline=None, **options):
+    """PVGIS TMY of a site with every timestamp moved to one year.
+
+    Returns the same (data, months_selected, inputs, metadata) tuple as
+    iotools.get_pvgis_tmy, from the cache when the site was already loaded.
+    Extra keyword arguments are passed to PVGIS and are part of the cache key.
+    Raises requests.exceptions.HTTPError for an invalid location and
+    TMYNotCached for a cache miss in offline mode.
+    """
+
+    if offline is None:
+        offline = is_offline()
+
+    # Nearby requests share the same cache entry
+    latitude, longitude = round(latitude, 2), round(longitude, 2)
+    root = store.cache_root('tmy')
+    path = os.path.join(root, tmy_key(latitude, longitude, **options))
+
+    if store.exists(path):
+        try:
+            data, meta = store.load_frame(path)
+            return data, meta['months_selected'], meta['inputs'], meta['metadata']
+        except (OSError, KeyError):
+            # Replaced or evicted by another process meanwhile
+            pass
+
+    if offline:
+        raise TMYNotCached(f'No cached TMY for ({latitude}, {longitude}) in offline mode')
+
+    # pvlib's readers and requests load only on a cache miss
+    from pvlib import iotools
+    data, months_selected, inputs, metadata = iotools.get_pvgis_tmy(latitude,
+                                                                    longitude,
+                                                                    map_variables=True,
+                                                                    **options)
+
+    data = to_single_year(data)
+
+    store.save_frame(path, data, {'months_selected': months_selected,
+                                  'inputs': inputs,
+                                  'metadata': metadata})
+    store.evict(root, tmy_cache_size)
+
+    return data, months_selected, inputs, metadata
+
+
+# Local files
+
+def _read_epw(path):
+    from pvlib import iotools
+    data, meta = iotools.read_epw(path)
+    return data, {'latitude': meta['latitude'], 'longitude': meta['longitude'],
+                  'altitude': meta['altitude'], 'name': meta['city']}
+
+
+def _read_tmy3(path):
+    from pvlib import iotools
+    data, meta = iotools.read_tmy3(path, map_variables=True)
+    return data, {'latitude': meta['latitude'], 'longitude': meta['longitude'],
+                  'altitude': meta['altitude'], 'name': meta['Name']}
+
+
+def _read_pvgis(path):
+    from pvlib import iotools
+    data, months_selected, inputs, _ = iotools.read_pvgis_tmy(path, pvgis_format='csv',
+                                                             map_variables=True)
+    return data, {'latitude': inputs['latitude'], 'longitude': inputs['longitude'],
+                  'altitude': inputs['elevation'], 'months_selected': months_selected}
+
+
+def _read_table(path):
+    if os.path.splitext(path)[1].lower() == '.parquet':
+        data = pd.read_parquet(path)
+        if not isinstance(data.index, pd.DatetimeIndex):
+            data = data.set_index(pd.to_datetime(data.pop(data.columns[0])))
+    else:
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+    return data, {}
+
+
+# name: (reader, extensions, typical year)
+readers = {'epw': (_read_epw, ('.epw',), True),
+           'tmy3': (_read_tmy3, (), True),
+           'pvgis': (_read_pvgis, (), True),
+           'table': (_read_table, ('.csv', '.parquet'), False)}
+
+
+def register_reader(name, reader, extensions=(), typical_year=False):
+    """Add a weather file format.
+
+    reader(path) returns (data, metadata): a frame with a DatetimeIndex and
+    the weather columns, under their names or the column_aliases, and a dict
+    with at least latitude and longitude when the file holds them. Typical
+    year formats get their timestamps moved to one year, as PVGIS TMYs.
+    """
+    readers[name] = (reader, tuple(extensions), typical_year)
+
+
+def weather_format(path):
+    """Name of the reader of a file, from its extension and first line."""
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, errors='replace') as f:
+            first = f.readline()
+        if first.startswith('Latitude'):
+            return 'pvgis'
+        fields = first.split(',')
+        if len(fields) == 7 and fields[0].strip().isdigit():
+            return 'tmy3'
+    for name, (_, extensions, _) in readers.items():
+        if extension in extensions:
+            return name
+    raise ValueError(f'Unknown weather file type {extension!r} for {path}')
+
+
+def normalize_weather(data):
+    """Frame with float weather_columns only, ghi, dni and dhi required."""
+
+    data = data.rename(columns=column_aliases)
+    missing = [column for column in weather_columns[:3] if column not in data]
+    if missing:
+        raise ValueError(f'Weather data without {", ".join(missing)} columns')
+    data = data[[column for column in weather_columns if column in data]].astype('float64')
+    return data[data.index.notna()].sort_index()
+
+
+def local_key(path, format):
+    stat = os.stat(path)
+    source = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, format])
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def load_weather(path, format=None, latitude=None, longitude=None):
+    """Weather frame and metadata of a local file.
+
+    The first call parses and normalizes the file into the cache, later
+    calls map the cached copy until the file changes. `latitude` and
+    `longitude` are stored for files that do not hold them, such as
+    measured station series. Returns (data, metadata).
+    """
+
+    format = format or weather_format(path)
+    root = store.cache_root('local')
+    entry = os.path.join(root, local_key(path, format))
+
+    if store.exists(entry):
+        try:
+            return store.load_frame(entry)
+        except (OSError, KeyError):
+            # Replaced or evicted by another process meanwhile
+            pass
+
+    reader, _, typical_year = readers[format]
+    data, meta = reader(path)
+    data = normalize_weather(data)
+    if typical_year:
+        data = to_single_year(data)
+
+    meta = dict(meta, source=os.path.abspath(path), format=format)
+    if latitude is not None:
+        meta['latitude'] = latitude
+    if longitude is not None:
+        meta['longitude'] = longitude
+
+    store.save_frame(entry, data, meta)
+    store.evict(root, local_cache_size)
+    return data, meta
+
+
+def warm(sites, delay=1.0):
+    """Download every (latitude, longitude) not cached yet, one request at a time."""
+
+    failed = []
+    for latitude, longitude in sites:
+        path = os.path.join(store.cache_root('tmy'), tmy_key(round(latitude, 2), round(longitude, 2)))
+        if store.exists(path):
+            continue
+        try:
+            get_tmy(latitude, longitude, offline=False)
+        except Exception as error:
+            failed.append((latitude, longitude, error))
+        # Stay well below the PVGIS rate limit
+        time.sleep(delay)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PVGIS TMY cache.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm_parser = subparsers.add_parser('warm', help='download the TMY of every site in a CSV '
+                                                     'with latitude and longitude columns')
+    warm_parser.add_argument('sites')
+    warm_parser.add_argument('--delay', type=float, default=1.0,
+                             help='seconds between PVGIS requests')
+    import_parser = subparsers.add_parser('import', help='parse local weather files into the cache')
+    import_parser.add_argument('files', nargs='+')
+    import_parser.add_argument('--format', choices=list(readers))
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        failed = 0
+        for path in args.files:
+            try:
+                load_weather(path, args.format)
+            except Exception as error:
+                print(f'{path}: {error}', file=sys.stderr)
+                failed += 1
+        return 1 if failed else 0
+
+    sites = pd.read_csv(args.sites)
+    failed = warm(zip(sites['latitude'], sites['longitude']), args.delay)
+    for latitude, longitude, error in failed:
+        print(f'({latitude}, {longitude}): {error}', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
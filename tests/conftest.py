@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the Bifacial Tool tests.
+
+The weather is the offline clear-sky year of the benchmarks, so no test needs
+the network, and the irradiance and weather caches go to a temporary
+directory instead of the user's one.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import os
+import sys
+import pytest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..', 'benchmarks'))
+
+from fixture import clear_sky_tmy  # noqa: E402
+
+# Mid January, April, July and October
+days = (15, 105, 196, 288)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('cache'))
+    previous = os.environ.get('BIFACIAL_TOOL_CACHE')
+    os.environ['BIFACIAL_TOOL_CACHE'] = root
+    yield root
+    if previous is None:
+        del os.environ['BIFACIAL_TOOL_CACHE']
+    else:
+        os.environ['BIFACIAL_TOOL_CACHE'] = previous
+
+
+@pytest.fixture(scope='session')
+def year():
+    """The whole clear-sky year, for annual sums and timings."""
+    return clear_sky_tmy()
+
+
+@pytest.fixture(scope='session')
+def weather(year):
+    """A few clear-sky days, one per season."""
+
+    return year[year.index.dayofyear.isin(days)]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Command line `stream` command: weather column aliases and failed scenarios.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import json
+import pandas as pd
+from bifacial_tool.cli import exit_failed_scenarios, exit_ok, main
+
+
+def write_scenarios(path):
+    scenarios = {'defaults': {'irradiance_model': 'infinite_sheds'},
+                 'scenarios': [{'name': 'fixed'}, {'name': 'tracker', 'tracking': 'Backtrack',
+                                                   'gcr': 0.4}]}
+    path.write_text(json.dumps(scenarios))
+    return str(path)
+
+
+def test_stream_reads_aliased_columns(weather, tmp_path):
+    weather_path = tmp_path / 'weather.csv'
+    weather.rename(columns={'ghi': 'GHI', 'dni': 'DNI', 'dhi': 'DHI', 'temp_air': 'T2m'}).to_csv(weather_path)
+    output = tmp_path / 'yearly.csv'
+
+    code = main(['stream', str(weather_path), write_scenarios(tmp_path / 'scenarios.json'),
+                 '-o', str(output), '--chunk-rows', '24'])
+
+    assert code == exit_ok
+    rows = pd.read_csv(output)
+    assert list(rows['name']) == ['fixed', 'tracker']
+    assert (rows['status'] == 'ok').all()
+    assert (rows['year'] == weather.index.year[0]).all()
+
+
+def test_stream_reports_failed_scenarios(weather, tmp_path):
+    weather_path = tmp_path / 'weather.csv'
+    weather.drop(columns='dhi').to_csv(weather_path)
+    output = tmp_path / 'yearly.csv'
+
+    code = main(['stream', str(weather_path), write_scenarios(tmp_path / 'scenarios.json'),
+                 '-o', str(output)])
+
+    assert code == exit_failed_scenarios
+    rows = pd.read_csv(output)
+    assert list(rows['status']) == ['failed', 'failed']
+    assert rows['error'].str.contains('dhi').all()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Batched electrical model against the pvlib ModelChain runs the GUI made.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+import pytest
+from bifacial_tool.databases import get_module, get_inverter
+from bifacial_tool.engine import (SimulationConfig, get_location, get_mount, get_solar_position,
+                                  get_orientation, get_irradiance, run_electrical,
+                                  temp_model_parameters, track_options)
+
+# Power differences allowed, relative to the peak of the series
+tolerance = 1e-6
+
+
+def modelchain_electrical(config, irrad):
+    """AC power (bifacial, non bifacial) and DC frame as the GUI computed them with ModelChain."""
+
+    from pvlib import modelchain, pvsystem
+
+    array = pvsystem.Array(mount = get_mount(config),
+                           module_parameters = get_module(config.module),
+                           temperature_model_parameters = temp_model_parameters,
+                           modules_per_string = config.modules_per_string,
+                           strings = config.strings)
+    system = pvsystem.PVSystem(arrays = [array],
+                               inverter_parameters = get_inverter(config.inverter),
+                               modules_per_string = config.modules_per_string,
+                               strings_per_inverter = config.strings,
+                               albedo = config.albedo)
+    mc = modelchain.ModelChain(system, get_location(config), aoi_model='no_loss')
+
+    mc.run_model_from_effective_irradiance(irrad.assign(effective_irradiance = irrad['total_abs_front']))
+    non_bifacial = mc.results.ac.copy()
+
+    effective_irradiance = irrad['total_abs_front'] + irrad['total_abs_back'] * config.bifaciality
+    mc.run_model_from_effective_irradiance(irrad.assign(effective_irradiance = effective_irradiance))
+    return mc.results.ac, non_bifacial, mc.results.dc
+
+
+@pytest.mark.parametrize('tracking', track_options)
+def test_electrical_matches_modelchain(weather, tracking):
+    # The irradiance is only the common input, the faster model will do
+    config = SimulationConfig(tracking=tracking, gcr=0.4 if tracking != 'Fixed tilt' else 1.0,
+                              irradiance_model='infinite_sheds')
+    solar_position = get_solar_position(config, weather.index)
+    orientation = get_orientation(config, solar_position)
+    irrad = get_irradiance(config, solar_position, orientation, weather, cache=False)
+
+    results, results_dc = run_electrical(config, irrad)
+    bifacial, non_bifacial, dc = modelchain_electrical(config, irrad)
+
+    pairs = {'bifacial': (results['bifacial'], bifacial),
+             'non bifacial': (results['non bifacial'], non_bifacial)}
+    for key in ('p_mp', 'v_mp', 'i_mp'):
+        pairs[key] = (results_dc[key], dc[key])
+
+    for key, (value, reference) in pairs.items():
+        value, reference = np.asarray(value, dtype='float64'), np.asarray(reference, dtype='float64')
+        peak = np.nanmax(np.abs(reference)) or 1.0
+        np.testing.assert_allclose(value, reference, rtol=0, atol=tolerance * peak, err_msg=key)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Irradiance stage: the pvfactors rows against pvlib's own wrapper, infinite
+sheds against pvfactors in accuracy and speed, and varying albedos solved
+exactly.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import time
+from dataclasses import replace
+import numpy as np
+import pytest
+from bifacial_tool.engine import (SimulationConfig, get_irradiance, get_orientation,
+                                  get_solar_position, run_electrical, track_options)
+from bifacial_tool import irradiance
+from bifacial_tool.irradiance import (horizon_band_angle, irradiance_columns, rho_back_pvrow,
+                                      rho_front_pvrow)
+
+pytest.importorskip('pvfactors')
+
+# Relative tolerances of infinite sheds on the annual sums
+tolerances = {'total_abs_front': 0.03,
+              'total_abs_back': 0.15,
+              'bifacial': 0.03}
+
+# Speed target of infinite sheds over pvfactors, on a full year of every mode
+min_speedup = 20
+
+
+def tracking_config(tracking, **kwargs):
+    return SimulationConfig(tracking=tracking, gcr=0.4 if tracking != 'Fixed tilt' else 1.0, **kwargs)
+
+
+def get_irradiance_albedo(config, solar_position, orientation, data, albedo, cache=True):
+    return irradiance.get_irradiance(solar_position, orientation, data, config.gcr,
+                                     config.row_height, config.row_width, albedo,
+                                     config.axis_azimuth, config.irradiance_model, cache)
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@pytest.mark.parametrize('tracking', track_options)
+def test_interior_row_matches_pvfactors_timeseries(weather, tracking):
+    from pvlib.bifacial.pvfactors import pvfactors_timeseries
+
+    config = tracking_config(tracking)
+    solar_position = get_solar_position(config, weather.index)
+    orientation = get_orientation(config, solar_position)
+    irrad = get_irradiance(config, solar_position, orientation, weather, cache=False)
+
+    # The call the GUI made before the all-rows solve
+    reference = pvfactors_timeseries(solar_position['azimuth'],
+                                     solar_position['apparent_zenith'],
+                                     orientation['surface_azimuth'],
+                                     orientation['surface_tilt'],
+                                     config.axis_azimuth,
+                                     weather.index,
+                                     weather['dni'],
+                                     weather['dhi'],
+                                     config.gcr,
+                                     config.row_height,
+                                     config.row_width,
+                                     config.albedo,
+                                     n_pvrows = 3,
+                                     index_observed_pvrow = 1,
+                                     rho_front_pvrow = rho_front_pvrow,
+                                     rho_back_pvrow = rho_back_pvrow,
+                                     horizon_band_angle = horizon_band_angle)
+    reference = dict(zip(['total_inc_front', 'total_inc_back', 'total_abs_front', 'total_abs_back'],
+                         reference))
+
+    for column in irradiance_columns:
+        np.testing.assert_allclose(irrad[column].to_numpy(),
+                                   np.asarray(reference[column], dtype='float64'),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
+
+
+@pytest.mark.parametrize('model', ['pvfactors', 'infinite_sheds'])
+def test_varying_albedo_is_solved_exactly(weather, model):
+    config = tracking_config('Backtrack', irradiance_model=model)
+    solar_position = get_solar_position(config, weather.index)
+    orientation = get_orientation(config, solar_position)
+
+    # Snow in January
+    january = weather.index.month == 1
+    albedo = np.where(january, 0.6, 0.2)
+    varying = get_irradiance_albedo(config, solar_position, orientation, weather, albedo)
+    uncached = get_irradiance_albedo(config, solar_position, orientation, weather, albedo, cache=False)
+    np.testing.assert_array_equal(varying.to_numpy(), uncached.to_numpy())
+
+    for value, hours in ((0.6, january), (0.2, ~january)):
+        constant = get_irradiance_albedo(config, solar_position, orientation, weather, value)
+        np.testing.assert_allclose(varying[hours].to_numpy(), constant[hours].to_numpy(),
+                                   rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture(scope='module')
+def model_runs(year):
+    """Annual sums and best run time of both models, per tracking mode."""
+
+    runs = {}
+    for tracking in track_options:
+        config = SimulationConfig(tracking=tracking, gcr=0.4)
+        # Infinite sheds assumes rows along the panel azimuth, pvfactors is told
+        if tracking == 'Fixed tilt':
+            config = replace(config, axis_azimuth=(config.pannel_azimuth + 90) % 360)
+        solar_position = get_solar_position(config, year.index)
+        orientation = get_orientation(config, solar_position)
+
+        for model, repeat in (('pvfactors', 2), ('infinite_sheds', 5)):
+            model_config = replace(config, irradiance_model=model)
+
+            def run():
+                return get_irradiance(model_config, solar_position, orientation, year, cache=False)
+
+            irrad = run()
+            runs[tracking, model] = {'seconds': best_time(run, repeat),
+                                     'total_abs_front': irrad['total_abs_front'].sum(),
+                                     'total_abs_back': irrad['total_abs_back'].sum(),
+                                     'bifacial': run_electrical(model_config, irrad)[0]['bifacial'].sum()}
+    return runs
+
+
+@pytest.mark.parametrize('tracking', track_options)
+def test_infinite_sheds_close_to_pvfactors(model_runs, tracking):
+    reference, fast = model_runs[tracking, 'pvfactors'], model_runs[tracking, 'infinite_sheds']
+    for key, tolerance in tolerances.items():
+        difference = fast[key] / reference[key] - 1
+        assert abs(difference) <= tolerance, f'{key}: {100 * difference:+.2f} %'
+
+
+def test_infinite_sheds_speedup(model_runs):
+    # Over the year of every tracking mode
+    seconds = {model: sum(model_runs[tracking, model]['seconds'] for tracking in track_options)
+               for model in irradiance.irradiance_models}
+    speedup = seconds['pvfactors'] / seconds['infinite_sheds']
+    assert speedup >= min_speedup, f'speedup {speedup:.1f}x'
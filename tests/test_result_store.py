@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Result store: runs listed and compared by their config fields.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import pytest
+from bifacial_tool.engine import SimulationConfig, run_simulation
+from bifacial_tool.result_store import compare, list_scenarios, save_result
+
+pytest.importorskip('pyarrow')
+
+monthly = (0.6, 0.5, 0.3, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.3, 0.5)
+
+
+def test_filter_on_monthly_albedo(weather, tmp_path):
+    root = str(tmp_path)
+    for name, albedo in (('constant', 0.2), ('monthly', monthly)):
+        config = SimulationConfig(albedo=albedo, irradiance_model='infinite_sheds')
+        save_result(run_simulation(config, weather), root, name)
+
+    assert list(list_scenarios(root, albedo=monthly)['name']) == ['monthly']
+    assert list(list_scenarios(root, albedo=0.2)['name']) == ['constant']
+    assert sorted(list_scenarios(root, albedo=[0.2, monthly])['name']) == ['constant', 'monthly']
+    assert list(compare(root, albedo=monthly).columns) == ['monthly']
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized sizing checks against the GUI's original ones.
+
+The reference is the per-module computation update_voltage and update_sizing
+did in the GUI before sizing.py: one single diode solve of the module at 60,
+20 and -10 C, then the PVsyst conditions and DC/AC ratio classes one by one.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+import pandas as pd
+from bifacial_tool.databases import get_module, get_inverter, get_modules, get_inverters
+from bifacial_tool.sizing import (check_temperatures, feasible_combinations, module_voltages,
+                                  sizing_check, sizing_messages, voltage_check, voltage_ok_message)
+
+# Relative difference allowed on the module voltages
+tolerance = 1e-9
+
+
+def reference_voltages(module_name):
+    """(v_mp at 60 C, v_mp at 20 C, v_oc at -10 C) as update_voltage solved them."""
+
+    from pvlib import pvsystem
+
+    module = get_module(module_name)
+    IL, I0, Rs, Rsh, nNsVth = pvsystem.calcparams_cec(effective_irradiance = 1000,
+                                                      temp_cell = pd.Series(check_temperatures),
+                                                      alpha_sc = module['alpha_sc'],
+                                                      a_ref = module['a_ref'],
+                                                      I_L_ref = module['I_L_ref'],
+                                                      I_o_ref = module['I_o_ref'],
+                                                      R_sh_ref = module['R_sh_ref'],
+                                                      R_s = module['R_s'],
+                                                      Adjust = 0)
+    curve_info = pvsystem.singlediode(IL, I0, Rs, Rsh, nNsVth, method='lambertw')
+    v_mp, v_oc = np.asarray(curve_info['v_mp']), np.asarray(curve_info['v_oc'])
+    return v_mp[0], v_mp[1], v_oc[2]
+
+
+def reference_voltage_text(module_name, inverter_name, n_modules, voltages):
+    """update_voltage's message, with the module voltages already solved."""
+
+    module = get_module(module_name)
+    inverter = get_inverter(inverter_name)
+    minimum_array_operating_voltage = voltages[0] * n_modules
+    maximum_array_operating_voltage = voltages[1] * n_modules
+    maximum_array_absolute_voltage = voltages[2] * n_modules
+    vmppt_min = inverter['Mppt_low']
+    vmppt_max = inverter['Mppt_high']
+    absolute_max_inverter_voltage = inverter['Vdco']
+    maximum_system_voltage = module['V_mp_ref']
+
+    if minimum_array_operating_voltage < vmppt_min:
+        return f'Voltage warning! Minimum array operating value ({minimum_array_operating_voltage:.2f}V)\n less than minimum inverter operating value ({vmppt_min:.2f}V)'
+    elif maximum_array_operating_voltage > vmppt_max:
+        return f'Voltage warning! Maximum array operating value ({maximum_array_operating_voltage:.2f}V)\n greater than maximum inverter operating value ({vmppt_max:.2f}V)'
+    elif maximum_array_absolute_voltage < vmppt_min:
+        return f'Voltage warning! Maximum array absolute value ({maximum_array_absolute_voltage:.2f}V)\n less than absolute inverter value ({absolute_max_inverter_voltage:.2f}V)'
+    elif maximum_array_absolute_voltage < maximum_system_voltage:
+        return f'Voltage warning! Maximum array operating value ({maximum_array_absolute_voltage:.2f}V)\n greater than maximum system specification value ({maximum_system_voltage:.2f}V)'
+    return 'Voltage between safety parameters.'
+
+
+def reference_sizing_text(module_name, inverter_name, n_rows, n_cols):
+    """update_sizing's message."""
+
+    pnom_ratio = get_module(module_name)['STC'] * n_rows * n_cols / get_inverter(inverter_name)['Pdco']
+    if pnom_ratio <= 1.15 and pnom_ratio >= 1:
+        return 'Inverter slightly oversized. '
+    elif pnom_ratio < 1:
+        return 'Warning! Inverter strongly oversized.'
+    elif pnom_ratio >= 1.3 and pnom_ratio <= 1.5:
+        return 'Inverter slightly undersized.'
+    elif pnom_ratio > 1.5:
+        return 'Warning! Inverter strongly undersized.'
+    return 'Inverter sizing between safety parameters.'
+
+
+def compare(modules, inverters, modules_per_string, strings):
+    """List of the differences found, empty when everything matches."""
+
+    problems = []
+    voltages = module_voltages()
+    references = {}
+    for name in modules:
+        references[name] = reference_voltages(name)
+        computed = voltages.loc[name, ['v_mp_hot', 'v_mp_nominal', 'v_oc_cold']].to_numpy(dtype='float64')
+        difference = np.max(np.abs(computed - references[name]) / np.abs(references[name]))
+        if not difference <= tolerance:
+            problems.append(f'{name}: voltages differ by {difference:.2e}')
+
+    allowed = {sizing_messages[key] for key in ('slightly oversized', 'ok', 'slightly undersized')}
+    expected = set()
+    for module in modules:
+        for inverter in inverters:
+            for n in modules_per_string:
+                text = reference_voltage_text(module, inverter, n, references[module])
+                if voltage_check(module, inverter, n) != text:
+                    problems.append(f'{module} / {inverter} / {n}: voltage message differs')
+                for s in strings:
+                    sizing = reference_sizing_text(module, inverter, n, s)
+                    if sizing_check(module, inverter, n, s) != sizing:
+                        problems.append(f'{module} / {inverter} / {n} x {s}: sizing message differs')
+                    if text == voltage_ok_message and sizing in allowed:
+                        expected.add((module, inverter, n, s))
+
+    feasible = set(feasible_combinations(modules_per_string, strings, modules, inverters).index)
+    for combination in sorted(expected ^ feasible):
+        side = 'missing from' if combination in expected else 'extra in'
+        problems.append(f'{combination} {side} feasible_combinations')
+    return problems
+
+
+def test_sizing_matches_gui_checks():
+    rng = np.random.default_rng(0)
+
+    # Only equipment with every parameter the checks read
+    modules = get_modules()
+    modules = modules.columns[modules.loc[['alpha_sc', 'a_ref', 'I_L_ref', 'I_o_ref', 'R_sh_ref',
+                                           'R_s', 'STC', 'V_mp_ref']].notna().all()]
+    inverters = get_inverters()
+    inverters = inverters.columns[inverters.loc[['Mppt_low', 'Mppt_high', 'Vdco', 'Pdco']].notna().all()]
+    modules = list(rng.choice(modules, 10, replace=False))
+    inverters = list(rng.choice(inverters, 10, replace=False))
+
+    problems = compare(modules, inverters, range(4, 31), range(1, 21))
+    assert not problems, '\n'.join(problems[:50])
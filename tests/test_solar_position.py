@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Portfolio solar position grid against pvlib's nrel_numpy SPA, site by site as
+Location.get_solarposition computes it.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+import pandas as pd
+from bifacial_tool.portfolio import solar_position_grid, temperature
+
+# latitude, longitude, altitude: both hemispheres, high latitude, altitude
+sites = [(40.45, -3.73, 0.0),
+         (-33.45, -70.66, 570.0),
+         (64.15, -21.94, 0.0),
+         (1.35, 103.82, 15.0),
+         (35.68, 139.69, 40.0),
+         (-23.7, 133.88, 2500.0)]
+
+# Largest angle difference allowed, degrees
+tolerance = 1e-6
+
+
+def test_grid_matches_get_solarposition():
+    from pvlib import atmosphere, solarposition
+
+    times = pd.date_range('2019-01-01', '2020-01-01', freq='h', inclusive='left', tz='UTC')
+    latitudes, longitudes, altitudes = (np.array(values) for values in zip(*sites))
+    grid = solar_position_grid(times, latitudes, longitudes, altitudes)
+
+    for i, (latitude, longitude, altitude) in enumerate(sites):
+        reference = solarposition.get_solarposition(times, latitude, longitude,
+                                                    altitude = altitude,
+                                                    pressure = atmosphere.alt2pres(altitude),
+                                                    method = 'nrel_numpy',
+                                                    temperature = temperature)
+        for key, values in grid.items():
+            difference = np.abs(values[i] - reference[key].to_numpy())
+            # Azimuths either side of north are close
+            if key == 'azimuth':
+                difference = np.minimum(difference, 360 - difference)
+            assert difference.max() <= tolerance, (key, latitude, longitude)
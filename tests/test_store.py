@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk store: entries are swapped whole and broken ones read as cache misses.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import os
+import numpy as np
+import pandas as pd
+from bifacial_tool import irradiance, store
+
+
+def frame(value):
+    index = pd.date_range('2019-01-01', periods=24, freq='h', tz='UTC')
+    return pd.DataFrame({'a': np.full(24, value), 'b': np.arange(24.0)}, index=index)
+
+
+def test_save_frame_replaces_entry_whole(tmp_path):
+    path = str(tmp_path / 'entry')
+    store.save_frame(path, frame(1.0), {'run': 1})
+    store.save_frame(path, frame(2.0), {'run': 2})
+
+    data, meta = store.load_frame(path)
+    assert meta == {'run': 2}
+    pd.testing.assert_frame_equal(data, frame(2.0), check_freq=False)
+    # Neither the new entry's temporary copy nor the old entry are left behind
+    assert os.listdir(tmp_path) == ['entry']
+
+
+def test_cached_recomputes_a_broken_entry():
+    irradiance.clear_memory()
+    key = 'test-broken-entry'
+    path = os.path.join(store.cache_root('irradiance'), key)
+    store.save_frame(path, frame(1.0))
+
+    # Evicted by another process between exists() and load_frame()
+    os.remove(os.path.join(path, 'values.npy'))
+    assert store.exists(path)
+
+    irrad = irradiance.cached(key, lambda: frame(3.0))
+    assert (irrad['a'] == 3.0).all()
+    irradiance.clear_memory()
+    assert (irradiance.cached(key, lambda: frame(4.0))['a'] == 3.0).all()
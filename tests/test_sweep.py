@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel sweeps against the same points run one by one.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+from bifacial_tool.engine import SimulationConfig, run_simulation
+from bifacial_tool.sweep import make_grid, run_sweep, total_fields
+
+
+def test_sweep_matches_serial_runs(weather):
+    base = SimulationConfig(tracking='Backtrack', gcr=0.4, irradiance_model='infinite_sheds')
+    # Two irradiance groups, each fanned out over the electrical points
+    grid = {'gcr': [0.3, 0.5], 'bifaciality': [0.6, 0.7, 0.8], 'strings': [3, 4]}
+
+    table = run_sweep(base, grid, weather, processes=3)
+
+    configs = make_grid(base, grid)
+    assert list(table.index) == list(range(len(configs)))
+    for point, config in enumerate(configs):
+        expected = run_simulation(config, weather).total_results
+        for key in grid:
+            assert table.loc[point, key] == getattr(config, key)
+        for key in total_fields:
+            np.testing.assert_allclose(table.loc[point, key], expected[key].iloc[0], rtol=1e-12)
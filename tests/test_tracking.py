@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Tracker orientation tables against pvlib.tracking.singleaxis, the function
+SingleAxisTrackerMount.get_orientation calls.
+
+@author: Jesús
+"""
+
+# Libraries
+
+import numpy as np
+import pytest
+from bifacial_tool.engine import SimulationConfig, get_solar_position
+from bifacial_tool.tracking import orientation_table, tracker_orientation
+
+# axis_tilt, axis_azimuth, max_angle
+axes = [(0, 180, 60), (10, 180, 60), (0, 90, 45), (5, 200, 55)]
+gcrs = [0.25, 0.4, 0.6]
+
+# Largest angle difference allowed, degrees
+tolerance = 1e-8
+
+columns = ['tracker_theta', 'aoi', 'surface_tilt', 'surface_azimuth']
+
+
+def assert_angles_close(value, reference, key):
+    value, reference = np.asarray(value, dtype='float64'), np.asarray(reference, dtype='float64')
+    np.testing.assert_array_equal(np.isnan(value), np.isnan(reference), err_msg=f'{key} night hours')
+    difference = np.abs(value - reference)
+    # Azimuths either side of north are close
+    if key == 'surface_azimuth':
+        difference = np.minimum(difference, 360 - difference)
+    assert np.nanmax(difference, initial=0) <= tolerance, key
+
+
+@pytest.mark.parametrize('backtrack', [True, False])
+@pytest.mark.parametrize('axis_tilt, axis_azimuth, max_angle', axes)
+def test_orientation_matches_singleaxis(weather, axis_tilt, axis_azimuth, max_angle, backtrack):
+    from pvlib import tracking
+
+    solar_position = get_solar_position(SimulationConfig(), weather.index)
+    table = orientation_table(solar_position, gcrs, axis_tilt, axis_azimuth, max_angle, backtrack)
+    for i, gcr in enumerate(gcrs):
+        reference = tracking.singleaxis(solar_position['apparent_zenith'],
+                                        solar_position['azimuth'],
+                                        axis_tilt = axis_tilt,
+                                        axis_azimuth = axis_azimuth,
+                                        max_angle = max_angle,
+                                        backtrack = backtrack,
+                                        gcr = gcr)
+        single = tracker_orientation(solar_position, gcr, axis_tilt, axis_azimuth, max_angle,
+                                     backtrack)
+        for key in columns:
+            assert_angles_close(single[key], reference[key], key)
+            assert_angles_close(table[key][i], reference[key], key)